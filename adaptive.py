@@ -0,0 +1,128 @@
+# adaptive.py
+
+"""
+Adaptive question selection: ask the questions that settle a profile fastest
+and stop once the top strengths are clear.
+
+A dimension's normalized score is the weighted mean of the answers to the
+questions touching it (weights from primary_dimension and secondary_weights).
+The estimate's variance is that of a weighted mean of answers with the session's
+answer variance, shrunk towards the variance of a uniformly random answer, and
+with a finite-population correction so it reaches zero once every question
+touching the dimension is answered. Dimensions without answers sit at the
+middle of the scale with the variance of a single answer.
+
+The next question is the unanswered one whose answer would reduce the variances
+the most, each weighted by how likely that dimension is to be on the other side
+of the top-3 cut-off used by the results page. The ranking is stable once every
+top-3 dimension is ahead of every other dimension by `z` standard errors of the
+difference at the configured one-sided confidence.
+"""
+
+from statistics import NormalDist
+
+import numpy as np
+
+from scoring import MAX_ANSWER, top_dimensions
+
+TOP_K = 3
+# Mean and variance of an answer chosen uniformly at random on the 1-5 scale
+PRIOR_MEAN = (1 + MAX_ANSWER) / 2
+PRIOR_VARIANCE = (MAX_ANSWER ** 2 - 1) / 12
+# Pseudo-answers the prior variance counts for against the session's own answers
+PRIOR_WEIGHT = 5
+DEFAULT_CONFIDENCE = 0.95
+# Never stop before this many answers, however consistent they are
+MIN_QUESTIONS = 10
+# Scale that makes the logistic function approximate the standard normal CDF
+_LOGISTIC_SCALE = 1.702
+
+
+class AdaptiveSelector:
+    """
+    Chooses questions and decides when to stop for one compiled QuizModel. Holds
+    only read-only arrays derived from the model, so one instance per bank can be
+    shared by every session; the session's state is its answer vector.
+    """
+
+    def __init__(self, model, confidence=DEFAULT_CONFIDENCE, min_questions=MIN_QUESTIONS):
+        self.model = model
+        self.weights = model.weights
+        self.squared_weights = model.weights ** 2
+        self.squared_weights.flags.writeable = False
+        self.total_weights = model.weights.sum(axis=0)
+        self.top_k = min(TOP_K, len(model.dimensions))
+        self.z = NormalDist().inv_cdf(confidence)
+        self.min_questions = min(min_questions, len(model.questions))
+
+    def _variances(self, answer_variance, weight_sums, squared_sums):
+        """Variances of the weighted-mean scores for the given sums of answered weights."""
+        remaining = np.clip(1 - weight_sums / self.total_weights, 0, 1)
+        scored = weight_sums > 0
+        safe_sums = np.where(scored, weight_sums, 1)
+        return np.where(scored, answer_variance * squared_sums / safe_sums ** 2 * remaining, answer_variance)
+
+    def estimates(self, answers):
+        """
+        Returns (means, variances, answer_variance): each dimension's estimated
+        score on the 1-5 scale and its variance, and the session's answer variance.
+        """
+        answered = answers > 0
+        values = answers[answered].astype(np.float64)
+        answered_weights = self.weights[answered]
+        weight_sums = answered_weights.sum(axis=0)
+        squared_sums = self.squared_weights[answered].sum(axis=0)
+
+        deviation = ((values - values.mean()) ** 2).sum() if values.size else 0.0
+        answer_variance = (PRIOR_WEIGHT * PRIOR_VARIANCE + deviation) / (PRIOR_WEIGHT + values.size)
+        scored = weight_sums > 0
+        means = np.where(scored, values @ answered_weights / np.where(scored, weight_sums, 1), PRIOR_MEAN)
+        return means, self._variances(answer_variance, weight_sums, squared_sums), answer_variance
+
+    def next_question(self, answers, candidates=None):
+        """
+        Returns the bank index of the most informative unanswered question, chosen
+        among `candidates` (bank indices) if given, or None if none is left.
+        """
+        unanswered = np.flatnonzero(answers == 0)
+        if candidates is not None:
+            unanswered = np.intersect1d(unanswered, candidates)
+        if unanswered.size == 0:
+            return None
+
+        means, variances, answer_variance = self.estimates(answers)
+        if self.top_k < len(means):
+            ranked = np.sort(means)[::-1]
+            cutoff = (ranked[self.top_k - 1] + ranked[self.top_k]) / 2
+            # Approximate chance that the true score is on the other side of the cut-off
+            distance = np.abs(means - cutoff) / np.sqrt(variances + 1e-12)
+            tail = np.exp(-_LOGISTIC_SCALE * distance)
+            relevance = tail / (1 + tail)
+        else:
+            relevance = np.ones_like(means)
+
+        answered = answers > 0
+        weight_sums = self.weights[answered].sum(axis=0) + self.weights[unanswered]
+        squared_sums = self.squared_weights[answered].sum(axis=0) + self.squared_weights[unanswered]
+        reductions = variances - self._variances(answer_variance, weight_sums, squared_sums)
+        return int(unanswered[np.argmax(reductions @ relevance)])
+
+    def is_stable(self, answers):
+        """
+        Returns True once the top-3 dimensions are settled at the configured
+        confidence (after at least `min_questions` answers), or when every question
+        is answered.
+        """
+        answered_count = np.count_nonzero(answers)
+        if answered_count >= len(answers):
+            return True
+        if answered_count < self.min_questions:
+            return False
+        means, variances, _ = self.estimates(answers)
+        top = top_dimensions(means, k=self.top_k)
+        rest = np.setdiff1d(np.arange(len(means)), top)
+        if rest.size == 0:
+            return True
+        gaps = means[top][:, None] - means[rest][None, :]
+        spread = np.sqrt(variances[top][:, None] + variances[rest][None, :])
+        return bool(np.all(gaps >= self.z * spread))
@@ -0,0 +1,294 @@
+# batch_scoring.py
+
+"""
+Headless batch scoring of stored quiz responses, without the Streamlit UI.
+
+Usage:
+    python -m jagged_quiz score responses.csv scores.parquet [--bank FILE] [--chunk-size N] [--workers N]
+    python -m jagged_quiz simulate [--respondents N] [--distribution NAME] ...  (see simulate.py)
+    python -m jagged_quiz export jagged_quiz.db exports/ [--batch-rows N] ...  (see export_results.py)
+    python -m jagged_quiz items [--bank FILE] [--from-db DB] ...  (see item_analysis.py)
+
+The input CSV has one row per submission and one column per question, named
+"q<index>" after the question's position in the question bank (q0, q1, ...).
+Answers are integers 1-5 or the answer labels shown in the quiz; blanks and 0
+mean unanswered. Every other column (e.g. a session id) is copied through.
+The output holds one normalized 0-5 score column per dimension plus the
+top three dimensions, written as Parquet, or as CSV for a .csv output path.
+"""
+
+import argparse
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from quiz_bank import DEFAULT_BANK_PATH, load_model
+from scoring import ANSWER_VALUES, MAX_ANSWER, top_dimensions
+
+TOP_K = 3
+
+# The model used by score_chunk in this process, set by _init_worker
+_model = None
+
+
+def _init_worker(bank_path):
+    """Loads the question bank once per process, instead of pickling it with every chunk."""
+    global _model
+    _model = load_model(bank_path)
+
+
+def question_columns(model):
+    """Returns the input column name of every question in the model, in bank order."""
+    return [f"q{i}" for i in range(len(model.questions))]
+
+
+def parse_answers(chunk, model):
+    """Converts the question columns of a chunk into an (N x Q) int8 answer matrix."""
+    columns = question_columns(model)
+    answers = np.zeros((len(chunk), len(columns)), dtype=np.int8)
+    for qi, column in enumerate(columns):
+        if column not in chunk:
+            continue
+        raw = chunk[column]
+        text = raw.astype(str).str.strip()
+        blank = raw.isna() | (text == "")
+        values = text.map(ANSWER_VALUES).fillna(pd.to_numeric(text, errors="coerce"))
+        invalid = ~blank & (values.isna() | (values < 0) | (values > MAX_ANSWER) | (values != values.round()))
+        if invalid.any():
+            bad_row = values.index[invalid][0]
+            raise ValueError(
+                f"Invalid answer {raw[bad_row]!r} in column {column}, row {bad_row}: "
+                f"expected an answer label or a whole number 0-{MAX_ANSWER}"
+            )
+        answers[:, qi] = values.fillna(0).to_numpy()
+    return answers
+
+
+def score_chunk(chunk):
+    """Scores one chunk of submissions and returns its output rows as a DataFrame."""
+    model = _model
+    answers = parse_answers(chunk, model)
+    _, _, normalized = model.score(answers)
+    top = top_dimensions(normalized, k=TOP_K)
+
+    columns = set(question_columns(model))
+    passthrough = [column for column in chunk.columns if column not in columns]
+    result = chunk[passthrough].reset_index(drop=True)
+    result["answered"] = (answers > 0).sum(axis=1)
+    scores = pd.DataFrame(normalized.astype(np.float32), columns=list(model.dimensions))
+    result = pd.concat([result, scores], axis=1)
+
+    dimension_names = np.array(model.dimensions, dtype=object)
+    has_score = np.take_along_axis(~np.isnan(normalized), top, axis=1)
+    for rank in range(TOP_K):
+        result[f"top_{rank + 1}"] = np.where(has_score[:, rank], dimension_names[top[:, rank]], None)
+    return result
+
+
+class _ResultWriter:
+    """Appends scored chunks to a Parquet file (or CSV) without holding them in memory."""
+
+    def __init__(self, path):
+        self.path = path
+        self.is_csv = path.lower().endswith(".csv")
+        self._parquet = None
+        self._schema = None
+        self.rows = 0
+
+    def write(self, frame):
+        if self.is_csv:
+            frame.to_csv(self.path, mode="a" if self.rows else "w", header=not self.rows, index=False)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet is None:
+                # All-empty text columns in the first chunk must still accept strings later.
+                self._schema = pa.schema([
+                    field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                    for field in table.schema
+                ])
+                self._parquet = pq.ParquetWriter(self.path, self._schema)
+            self._parquet.write_table(table.cast(self._schema))
+        self.rows += len(frame)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def score_file(input_path, output_path, chunk_size=50_000, workers=None, bank_path=DEFAULT_BANK_PATH):
+    """
+    Streams `input_path` in chunks of `chunk_size` rows, scores the chunks against
+    the bank at `bank_path` on a process pool of `workers` processes (in-process when
+    workers <= 1), and writes the results to `output_path` in input order.
+    Returns the number of rows scored.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    # Answers and ids are read as strings so that labels and leading zeros survive.
+    reader = pd.read_csv(input_path, chunksize=chunk_size, dtype=str, keep_default_na=False)
+    writer = _ResultWriter(output_path)
+    try:
+        if workers <= 1:
+            _init_worker(bank_path)
+            for chunk in reader:
+                writer.write(score_chunk(chunk))
+        else:
+            # Bound the number of chunks in flight so memory stays flat on huge files.
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(bank_path,)) as pool:
+                pending = deque()
+                for chunk in reader:
+                    pending.append(pool.submit(score_chunk, chunk))
+                    if len(pending) >= 2 * workers:
+                        writer.write(pending.popleft().result())
+                while pending:
+                    writer.write(pending.popleft().result())
+    finally:
+        writer.close()
+    return writer.rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m jagged_quiz", description="Jagged Learning Profile Quiz tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    score = commands.add_parser("score", help="Score a CSV of quiz responses.")
+    score.add_argument("input", help="CSV file with one row per submission and q<index> answer columns.")
+    score.add_argument("output", help="Output .parquet (or .csv) file.")
+    score.add_argument("--bank", default=DEFAULT_BANK_PATH, help="Question bank file (default: banks/default.json).")
+    score.add_argument("--chunk-size", type=int, default=50_000, help="Rows per chunk (default: 50000).")
+    score.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+
+    simulate = commands.add_parser("simulate", help="Score synthetic respondents to calibrate the normalization.")
+    simulate.add_argument("--respondents", type=int, default=1_000_000, help="Synthetic respondents (default: 1000000).")
+    simulate.add_argument(
+        "--distribution", choices=["uniform", "biased", "correlated"], default="uniform",
+        help="Answer distribution (default: uniform).",
+    )
+    simulate.add_argument(
+        "--probabilities", type=lambda value: [float(p) for p in value.split(",")],
+        help="biased: comma-separated probabilities of answers 1-5 (default: 0.05,0.1,0.2,0.3,0.35).",
+    )
+    simulate.add_argument("--rho", type=float, help="correlated: correlation between dimensions' traits (default: 0.3).")
+    simulate.add_argument("--noise-sd", type=float, help="correlated: answer noise standard deviation (default: 0.8).")
+    simulate.add_argument("--bank", default=DEFAULT_BANK_PATH, help="Question bank file (default: banks/default.json).")
+    simulate.add_argument("--seed", type=int, default=None, help="Random seed.")
+    simulate.add_argument("--batch-size", type=int, default=100_000, help="Respondents per batch (default: 100000).")
+    simulate.add_argument("--workers", type=int, default=1, help="Worker processes (default: 1).")
+    simulate.add_argument("--json", help="Also write the report as JSON to this file.")
+
+    export = commands.add_parser("export", help="Append newly completed quizzes to partitioned Parquet datasets.")
+    export.add_argument("database", help="The app's SQLite response store (JAGGED_QUIZ_DB).")
+    export.add_argument("output", help="Directory holding the responses/ and scores/ datasets.")
+    export.add_argument("--batch-rows", type=int, default=200_000, help="Answers per record batch (default: 200000).")
+    export.add_argument(
+        "--grace", type=float, default=60, help="Skip quizzes completed in the last GRACE seconds (default: 60).",
+    )
+    export.add_argument(
+        "--bank", action="append", default=[], help="Bank file outside banks/ to score with (repeatable).",
+    )
+    export.add_argument(
+        "--include-debug", action="store_true", help="Also export quizzes completed by the debug tools, flagged debug.",
+    )
+
+    items = commands.add_parser("items", help="Report item statistics: Cronbach's alpha and item-total correlations.")
+    items.add_argument("--bank", default=DEFAULT_BANK_PATH, help="Question bank file (default: banks/default.json).")
+    items.add_argument(
+        "--norms-dir", default=os.environ.get("JAGGED_QUIZ_NORMS_DIR", "norms"),
+        help="Directory of the app's accumulated statistics (default: JAGGED_QUIZ_NORMS_DIR or norms).",
+    )
+    items.add_argument("--from-db", help="Compute the statistics from this SQLite response store instead.")
+    items.add_argument(
+        "--save", action="store_true", help="With --from-db, replace the accumulated statistics with the result.",
+    )
+    items.add_argument("--json", help="Also write the full report, with correlation matrices, to this file.")
+    args = parser.parse_args(argv)
+
+    if args.command == "simulate":
+        return run_simulation(args)
+    if args.command == "export":
+        return run_export(args)
+    if args.command == "items":
+        return run_item_analysis(args)
+    rows = score_file(args.input, args.output, chunk_size=args.chunk_size, workers=args.workers, bank_path=args.bank)
+    print(f"Scored {rows} submissions -> {args.output}")
+    return 0
+
+
+def run_simulation(args):
+    """Runs the `simulate` command."""
+    import json
+    import time
+
+    from simulate import format_report, simulate
+
+    params = {}
+    if args.distribution == "biased" and args.probabilities:
+        params["probabilities"] = args.probabilities
+    if args.distribution == "correlated":
+        params.update({name: value for name, value in (("rho", args.rho), ("noise_sd", args.noise_sd)) if value is not None})
+
+    start = time.perf_counter()
+    stats = simulate(
+        args.respondents, args.distribution, bank_path=args.bank, seed=args.seed,
+        batch_size=args.batch_size, workers=args.workers, **params,
+    )
+    elapsed = time.perf_counter() - start
+    report = stats.report()
+    print(format_report(report))
+    print(f"\nSimulated in {elapsed:.1f} s ({args.respondents / elapsed:,.0f} respondents/s)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+def run_export(args):
+    """Runs the `export` command."""
+    from export_results import export_results
+
+    summary = export_results(
+        args.database, args.output, batch_rows=args.batch_rows, grace_seconds=args.grace, extra_banks=args.bank,
+        include_debug=args.include_debug,
+    )
+    print(
+        f"Exported {summary['sessions']} completed quizzes ({summary['answers']} answers, "
+        f"{summary['scored_sessions']} scored) -> {args.output}"
+    )
+    if summary["unknown_bank_sessions"]:
+        print(f"{summary['unknown_bank_sessions']} quizzes used a bank version that is no longer available and were not scored")
+    return 0
+
+
+def run_item_analysis(args):
+    """Runs the `items` command."""
+    import json
+
+    from item_analysis import ItemStats, analyze, format_report, stats_from_database
+    from norms import FileLock
+
+    model = load_model(args.bank)
+    path = os.path.join(args.norms_dir, f"{model.fingerprint}.items.npz")
+    if args.from_db:
+        stats = stats_from_database(args.from_db, model)
+        if args.save:
+            os.makedirs(args.norms_dir, exist_ok=True)
+            with FileLock(f"{path}.lock"):
+                stats.save(path)
+    else:
+        stats = ItemStats.load(path, len(model.questions))
+    report = analyze(model, stats)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+# benchmarks.py
+
+"""
+Micro-benchmarks for the stages behind the results page, over synthetic question
+banks of growing size, to find where scoring and rendering stop scaling.
+
+Usage:
+    python benchmarks.py [--sizes 60x15,1000x100,...] [--repeat N] [--output FILE] [--compare FILE]
+
+Each stage is timed in isolation against a compiled synthetic bank:
+
+    compile_model       question bank -> QuizModel
+    build_connections   dimension graph weights from the secondary weights
+    accumulate          ScoreAccumulator.update for every question of one session
+    score_batch         scoring 1000 full answer vectors at once
+    normalize           normalize_scores for one session
+    spring_layout       compute_dimension_layout (graph + NetworkX spring layout)
+    network_figure      create_network_chart from a precomputed layout
+    radar_figure        create_radar_chart
+    network_json        Plotly JSON serialization of the network figure
+    radar_json          Plotly JSON serialization of the radar figure
+
+Results are written as JSON (best and median seconds per call for every stage
+and size, plus the Python and library versions) so runs of different versions
+can be compared; --compare prints the ratios against an earlier results file.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import timeit
+
+import numpy as np
+
+from charts import compute_dimension_layout, create_network_chart, create_radar_chart
+from lazy_imports import lazy_import
+from scoring import MAX_ANSWER, ScoreAccumulator, build_connections, compile_model, normalize_scores
+
+# (questions, dimensions) of the benchmarked banks; the first is the size of the default bank
+DEFAULT_SIZES = [(60, 15), (250, 30), (1000, 100), (2500, 200), (10000, 500)]
+SECONDARY_WEIGHTS_PER_QUESTION = 2
+BATCH_SIZE = 1000
+
+
+def synthetic_bank(n_questions, n_dimensions, secondary_per_question=SECONDARY_WEIGHTS_PER_QUESTION, seed=0):
+    """
+    Returns a bank dict shaped like banks/default.json with `n_questions` questions
+    spread evenly over `n_dimensions` primary dimensions, each question with
+    `secondary_per_question` random secondary weights between 0.1 and 0.5.
+    """
+    rng = np.random.default_rng(seed)
+    dimensions = [f"Dimension {i:03d}" for i in range(n_dimensions)]
+    questions = []
+    for qi in range(n_questions):
+        primary = qi % n_dimensions
+        others = np.delete(np.arange(n_dimensions), primary)
+        secondary = rng.choice(others, size=min(secondary_per_question, len(others)), replace=False)
+        questions.append({
+            "question": f"Synthetic question {qi}",
+            "primary_dimension": dimensions[primary],
+            "secondary_weights": {dimensions[d]: round(float(rng.uniform(0.1, 0.5)), 2) for d in secondary},
+        })
+    return {
+        "title": f"Synthetic bank {n_questions}x{n_dimensions}",
+        "questions": questions,
+        "learning_paths_and_careers": {dim: {"learning": [], "careers": []} for dim in dimensions},
+    }
+
+
+def time_stage(func, repeat):
+    """Times `func()`, returning (best, median) seconds per call over `repeat` runs."""
+    timer = timeit.Timer(func)
+    # Calls per run so that one run takes at least ~0.1 s, as in `python -m timeit`
+    number, _ = timer.autorange()
+    number = max(1, number // 2)
+    runs = np.array(timer.repeat(repeat=repeat, number=number)) / number
+    return float(runs.min()), float(np.median(runs))
+
+
+def benchmark_bank(n_questions, n_dimensions, repeat=5, seed=0):
+    """Runs every stage against one synthetic bank and returns {stage: timings}."""
+    bank = synthetic_bank(n_questions, n_dimensions, seed=seed)
+    questions = bank["questions"]
+    model = compile_model(questions, bank["learning_paths_and_careers"], title=bank["title"])
+    rng = np.random.default_rng(seed)
+    answers = rng.integers(1, MAX_ANSWER + 1, size=n_questions, dtype=np.int8)
+    batch = rng.integers(1, MAX_ANSWER + 1, size=(BATCH_SIZE, n_questions), dtype=np.int8)
+
+    def accumulate():
+        accumulator = ScoreAccumulator(model)
+        for qi, answer in enumerate(answers):
+            accumulator.update(qi, 0, answer)
+        return accumulator
+
+    accumulator = accumulate()
+    normalized = accumulator.normalized()
+    scores_normalized = {dim: float(normalized[i]) for i, dim in enumerate(model.dimensions)}
+    layout = compute_dimension_layout(model.dimensions, model.connections)
+    network = create_network_chart(model, scores_normalized, layout=layout)
+    radar = create_radar_chart(scores_normalized)
+
+    stages = {
+        "compile_model": lambda: compile_model(questions, bank["learning_paths_and_careers"]),
+        "build_connections": lambda: build_connections(questions),
+        "accumulate": accumulate,
+        "score_batch": lambda: model.score(batch),
+        "normalize": lambda: normalize_scores(accumulator.raw_scores, accumulator.max_scores),
+        "spring_layout": lambda: compute_dimension_layout(model.dimensions, model.connections),
+        "network_figure": lambda: create_network_chart(model, scores_normalized, layout=layout),
+        "radar_figure": lambda: create_radar_chart(scores_normalized),
+        "network_json": network.to_json,
+        "radar_json": radar.to_json,
+    }
+    results = {}
+    for stage, func in stages.items():
+        best, median = time_stage(func, repeat)
+        results[stage] = {"best_s": best, "median_s": median}
+    return {
+        "questions": n_questions,
+        "dimensions": n_dimensions,
+        "edges": len(layout[1]),
+        "network_json_bytes": len(network.to_json()),
+        "stages": results,
+    }
+
+
+def environment():
+    """Returns the interpreter and library versions the benchmarks ran against."""
+    versions = {"python": platform.python_version(), "numpy": np.__version__}
+    for module_name in ("plotly", "networkx"):
+        versions[module_name] = lazy_import(module_name).__version__
+    return {"platform": platform.platform(), "versions": versions}
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, repeat=5, seed=0, progress=None):
+    """Benchmarks every (questions, dimensions) size and returns the results dict."""
+    banks = []
+    for n_questions, n_dimensions in sizes:
+        if progress:
+            progress(f"Benchmarking {n_questions} questions x {n_dimensions} dimensions...")
+        banks.append(benchmark_bank(n_questions, n_dimensions, repeat, seed))
+    return {"created_at": time.time(), "repeat": repeat, "seed": seed, **environment(), "banks": banks}
+
+
+def format_results(results, baseline=None):
+    """
+    Renders the median time per call of every stage as a table, one column per bank
+    size. With a baseline results file, each cell also shows the ratio to it.
+    """
+    banks = results["banks"]
+    previous = {}
+    for bank in (baseline or {}).get("banks", []):
+        previous[(bank["questions"], bank["dimensions"])] = bank["stages"]
+
+    headers = [f"{bank['questions']}x{bank['dimensions']}" for bank in banks]
+    width = 20 if baseline else 12
+    lines = [f"{'stage':<18}" + "".join(f"{header:>{width}}" for header in headers)]
+    for stage in banks[0]["stages"]:
+        cells = []
+        for bank in banks:
+            median = bank["stages"][stage]["median_s"]
+            cell = f"{median * 1000:.3f} ms"
+            before = previous.get((bank["questions"], bank["dimensions"]), {}).get(stage)
+            if before:
+                cell += f" ({median / before['median_s']:.2f}x)"
+            cells.append(f"{cell:>{width}}")
+        lines.append(f"{stage:<18}" + "".join(cells))
+    lines.append(f"{'edges':<18}" + "".join(f"{bank['edges']:>{width}}" for bank in banks))
+    lines.append(
+        f"{'network JSON':<18}" + "".join(f"{bank['network_json_bytes'] / 1024:>{width - 4}.0f} KiB" for bank in banks)
+    )
+    return "\n".join(lines)
+
+
+def parse_sizes(value):
+    """Parses "60x15,1000x100" into [(60, 15), (1000, 100)]."""
+    try:
+        return [tuple(int(n) for n in size.split("x")) for size in value.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid sizes {value!r}, expected e.g. 60x15,1000x100")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark scoring, layout and figure building across bank sizes.")
+    parser.add_argument(
+        "--sizes", type=parse_sizes, default=DEFAULT_SIZES,
+        help="Comma-separated QUESTIONSxDIMENSIONS bank sizes (default: 60x15 up to 10000x500).",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Timing runs per stage (default: 5).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic banks (default: 0).")
+    parser.add_argument("--output", default="benchmark_results.json", help="Results file (default: benchmark_results.json).")
+    parser.add_argument("--compare", help="Earlier results file to compare against.")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = run_benchmarks(args.sizes, args.repeat, args.seed, progress=lambda msg: print(msg, file=sys.stderr))
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(format_results(results, baseline))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
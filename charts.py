@@ -0,0 +1,230 @@
+# charts.py
+
+"""
+Plotly figures for the results page: the network of learning dimensions and the
+radar chart of a profile; and for the class dashboard, the archetype heatmap.
+Kept free of Streamlit so the figures can be built and benchmarked outside the
+app; the app caches the dimension layout per bank.
+"""
+
+from lazy_imports import lazy_import
+
+
+def compute_dimension_layout(dimensions, connections):
+    """
+    Builds the dimension graph of a question bank and its force-directed layout.
+    Returns (positions, edges): node positions by dimension and (dim1, dim2, weight)
+    for every connected pair.
+    """
+    nx = lazy_import("networkx")
+
+    # Create a NetworkX graph
+    G = nx.Graph()
+    G.add_nodes_from(dimensions)
+    for (dim1, dim2), weight in connections.items():
+        if weight > 0:
+            G.add_edge(dim1, dim2, weight=weight)
+
+    # Use NetworkX's spring layout for a force-directed effect
+    pos = nx.spring_layout(G, k=0.5, iterations=50, seed=42) # k: optimal distance between nodes, iterations: number of iterations
+
+    positions = {dim: (float(x), float(y)) for dim, (x, y) in pos.items()}
+    edges = [
+        (dim1, dim2, connections.get(tuple(sorted((dim1, dim2))), 0))
+        for dim1, dim2 in G.edges()
+    ]
+    return positions, edges
+
+
+# Edges are drawn in this many weight buckets (one trace each) unless the chart is
+# asked for one trace per edge. Above WEBGL_EDGE_THRESHOLD edges the bucket traces
+# switch to WebGL, which keeps browser frame times flat on large graphs.
+EDGE_BUCKETS = 5
+WEBGL_EDGE_THRESHOLD = 500
+
+
+def _edge_style(weight):
+    """Returns the line width and colour used to draw an edge of the given weight."""
+    # We need a small weight to avoid a zero-width line
+    line_width = max(0.5, weight * 3)
+
+    # Use a color scale to give the lines a dynamic, flowing look
+    # Normalizing the weight for the color scale (assuming max weight is 5)
+    normalized_weight_for_color = min(weight / 5.0, 1.0)
+    color = f'rgba(68, 1, 84, {normalized_weight_for_color})' # Use a single color with a dynamic alpha for a flow effect
+    return line_width, color
+
+
+def _per_edge_traces(pos, edges):
+    """Creates one trace per edge so every line has its own width and alpha."""
+    go = lazy_import("plotly.graph_objects")
+    edge_traces = []
+    for dim1, dim2, weight in edges:
+        x0, y0 = pos[dim1]
+        x1, y1 = pos[dim2]
+        line_width, color = _edge_style(weight)
+        edge_traces.append(go.Scatter(
+            x=[x0, x1, None],
+            y=[y0, y1, None],
+            line=dict(width=line_width, color=color),
+            hoverinfo='text',
+            text=f"Connection: {dim1} - {dim2}<br>Weight: {weight:.2f}",
+            mode='lines',
+            opacity=0.8
+        ))
+    return edge_traces
+
+
+def _bucketed_edge_traces(pos, edges, buckets, use_webgl):
+    """
+    Groups edges into equal-width weight buckets and draws each bucket as a single
+    trace of None-separated segments, styled by the bucket's mean weight. Edge hover
+    text is carried by one extra trace of invisible markers at the edge midpoints.
+    """
+    go = lazy_import("plotly.graph_objects")
+    scatter = go.Scattergl if use_webgl else go.Scatter
+    max_weight = max(weight for _, _, weight in edges)
+    grouped = {}
+    for edge in edges:
+        bucket = min(int(edge[2] / max_weight * buckets), buckets - 1) if max_weight > 0 else 0
+        grouped.setdefault(bucket, []).append(edge)
+
+    edge_traces = []
+    for bucket in sorted(grouped):
+        bucket_edges = grouped[bucket]
+        x, y = [], []
+        for dim1, dim2, _ in bucket_edges:
+            x += [pos[dim1][0], pos[dim2][0], None]
+            y += [pos[dim1][1], pos[dim2][1], None]
+        line_width, color = _edge_style(sum(e[2] for e in bucket_edges) / len(bucket_edges))
+        edge_traces.append(scatter(
+            x=x, y=y,
+            line=dict(width=line_width, color=color),
+            hoverinfo='skip',
+            mode='lines',
+            opacity=0.8
+        ))
+
+    edge_traces.append(scatter(
+        x=[(pos[dim1][0] + pos[dim2][0]) / 2 for dim1, dim2, _ in edges],
+        y=[(pos[dim1][1] + pos[dim2][1]) / 2 for dim1, dim2, _ in edges],
+        mode='markers',
+        marker=dict(size=8, opacity=0),
+        hoverinfo='text',
+        text=[f"Connection: {dim1} - {dim2}<br>Weight: {weight:.2f}" for dim1, dim2, weight in edges],
+    ))
+    return edge_traces
+
+
+def create_network_chart(model, scores_normalized, edge_buckets=EDGE_BUCKETS, use_webgl=None, layout=None):
+    """
+    Creates an interactive network diagram of all of the model's dimensions using a
+    force-directed layout similar to Obsidian's graph view.
+
+    Edges are grouped into `edge_buckets` weight buckets with one trace per bucket, which
+    keeps the figure payload small; pass edge_buckets=None for one trace per edge.
+    `use_webgl` renders the bucketed edges with Scattergl; by default it is enabled
+    once the graph has more than WEBGL_EDGE_THRESHOLD edges. `layout` is the bank's
+    (positions, edges) from compute_dimension_layout, computed here if not given.
+    """
+    go = lazy_import("plotly.graph_objects")
+    if not scores_normalized:
+        return go.Figure()
+
+    pos, edges = layout or compute_dimension_layout(model.dimensions, model.connections)
+    dimensions = list(model.dimensions)
+
+    if use_webgl is None:
+        use_webgl = len(edges) > WEBGL_EDGE_THRESHOLD
+    if not edges:
+        edge_traces = []
+    elif edge_buckets:
+        edge_traces = _bucketed_edge_traces(pos, edges, edge_buckets, use_webgl)
+    else:
+        edge_traces = _per_edge_traces(pos, edges)
+
+    # Create nodes for the network
+    node_x = [pos[dim][0] for dim in dimensions]
+    node_y = [pos[dim][1] for dim in dimensions]
+    node_scores = [scores_normalized.get(dim, 1) for dim in dimensions]
+    node_text = [
+        f"{dim}<br>Score: {scores_normalized.get(dim, 1):.2f}" for dim in dimensions
+    ]
+
+    # Scale node size for better visualization
+    node_sizes = [score * 10 for score in node_scores]
+
+    node_trace = go.Scatter(
+        x=node_x, y=node_y,
+        mode='markers+text',
+        hovertemplate=node_text,
+        text=dimensions,
+        textposition="bottom center",
+        marker=dict(
+            colorscale='Viridis',
+            reversescale=True,
+            color=node_scores,
+            size=node_sizes,
+            colorbar=dict(
+                thickness=15,
+                title=dict(text='Score', side='right'),
+                tickvals=[1, 2, 3, 4, 5],
+                ticktext=['1', '2', '3', '4', '5'],
+            ),
+            line_width=2
+        ),
+        textfont=dict(size=10)
+    )
+    
+    # Combine all traces for the final figure
+    fig_data = edge_traces + [node_trace]
+    fig = go.Figure(data=fig_data,
+                    layout=go.Layout(
+                        title=dict(text='Network of Your Learning Dimensions', font=dict(size=20)),
+                        showlegend=False,
+                        hovermode='closest',
+                        margin=dict(b=20,l=5,r=5,t=40),
+                        xaxis=dict(showgrid=False, zeroline=False, showticklabels=False, range=[-1.2, 1.2]),
+                        yaxis=dict(showgrid=False, zeroline=False, showticklabels=False, range=[-1.2, 1.2]),
+                        height=600
+                    )
+                   )
+
+    return fig
+
+
+def create_radar_chart(scores_normalized):
+    """Creates the radar chart of the normalized score per dimension."""
+    go = lazy_import("plotly.graph_objects")
+    fig_radar = go.Figure()
+    fig_radar.add_trace(go.Scatterpolar(
+        r=list(scores_normalized.values()),
+        theta=list(scores_normalized.keys()),
+        fill='toself',
+        name='Learning Profile'
+    ))
+    fig_radar.update_layout(
+        polar=dict(radialaxis=dict(visible=True, range=[1, 5])),
+        showlegend=False,
+        title_text="", # Removed title here to avoid duplication
+        title_x=0.5 # Center the title
+    )
+    return fig_radar
+
+
+def create_archetype_heatmap(dimensions, archetypes):
+    """Creates the heatmap of each archetype's average normalized score per dimension."""
+    go = lazy_import("plotly.graph_objects")
+    fig = go.Figure(go.Heatmap(
+        z=[archetype["centroid"].tolist() for archetype in archetypes],
+        x=list(dimensions),
+        y=[f"Archetype {i} ({archetype['count']})" for i, archetype in enumerate(archetypes, 1)],
+        zmin=0, zmax=5, colorscale="Viridis",
+        hovertemplate="%{y}<br>%{x}: %{z:.2f}<extra></extra>",
+    ))
+    fig.update_layout(
+        yaxis=dict(autorange="reversed"),
+        xaxis=dict(tickangle=-35),
+        margin=dict(l=20, r=20, t=20, b=20),
+    )
+    return fig
@@ -0,0 +1,188 @@
+# cohorts.py
+
+"""
+Learner archetypes per class: profiles grouped by online k-means over the
+normalized scores of everyone in a class who completed the quiz.
+
+CohortClusters keeps only aggregates: per cluster a centroid, a member count and
+the within-cluster sum of squares, plus the class's score sums. Each completed
+profile joins its nearest centroid, which moves to the exact running mean of
+its members (MacQueen's sequential k-means), so an update costs O(k x D)
+whatever the size of the cohort and nothing ever rescans earlier profiles. The
+first profiles seed the clusters until there are `k` distinct ones.
+
+CohortStore persists one set of clusters per question bank and class as
+<directory>/<bank fingerprint>/<class>.npz, so processes sharing the directory
+build the same clusters. Like the score norms, each process buffers completed
+profiles in memory and a background thread adds them to the files under an
+exclusive file lock, so a completion never waits on disk or on other processes.
+Every profile also joins the school-wide cohort, SCHOOL.
+"""
+
+import logging
+import os
+import re
+import threading
+
+import numpy as np
+
+from norms import FLUSH_INTERVAL, FileLock, PeriodicFlusher
+from recommend import fill_unscored
+
+CLUSTERS = 4
+SCHOOL = "_school"
+# Class names come from the URL; they must be usable as a file name
+CLASS_NAME_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]{0,63}")
+
+logger = logging.getLogger(__name__)
+
+
+def valid_class_name(name):
+    return bool(CLASS_NAME_PATTERN.fullmatch(name or ""))
+
+
+class CohortClusters:
+    """Online k-means clusters of one cohort's normalized score profiles."""
+
+    def __init__(self, dimensions, k=CLUSTERS, centroids=None, counts=None, inertia=None, sums=None):
+        self.dimensions = tuple(dimensions)
+        d = len(self.dimensions)
+        self.centroids = np.zeros((k, d)) if centroids is None else centroids
+        self.counts = np.zeros(k, dtype=np.int64) if counts is None else counts
+        self.inertia = np.zeros(k) if inertia is None else inertia
+        self.sums = np.zeros(d) if sums is None else sums
+        if self.centroids.shape != (len(self.counts), d):
+            raise ValueError(f"expected centroids of shape {(len(self.counts), d)}, got {self.centroids.shape}")
+
+    @property
+    def size(self):
+        """Number of profiles in the cohort."""
+        return int(self.counts.sum())
+
+    @property
+    def mean(self):
+        """The cohort's mean profile (NaN for an empty cohort)."""
+        return self.sums / self.size if self.size else np.full(len(self.dimensions), np.nan)
+
+    def add(self, normalized):
+        """Adds a normalized score vector (D,) or batch (N x D) of completed profiles, in order."""
+        for profile in fill_unscored(np.atleast_2d(np.asarray(normalized, dtype=np.float64))):
+            self.sums += profile
+            seeded = self.counts > 0
+            distances = np.where(seeded, ((self.centroids - profile) ** 2).sum(axis=1), np.inf)
+            nearest = int(np.argmin(distances))
+            if not seeded.all() and distances[nearest] > 0:
+                # A profile unlike every cluster so far seeds the next one
+                nearest = int(np.flatnonzero(~seeded)[0])
+                self.centroids[nearest] = profile
+                self.counts[nearest] = 1
+                continue
+            n = self.counts[nearest] + 1
+            # Running sum of squares about the running mean (Welford's update)
+            self.inertia[nearest] += distances[nearest] * (n - 1) / n
+            self.centroids[nearest] += (profile - self.centroids[nearest]) / n
+            self.counts[nearest] = n
+
+    def archetypes(self, strengths=2):
+        """
+        Returns the non-empty clusters, largest first, as dicts with the cluster's
+        index, member count, share of the cohort, centroid, spread (root mean square
+        distance of members from the centroid) and the `strengths` dimensions in
+        which its centroid stands furthest above the cohort's mean.
+        """
+        mean = self.mean
+        archetypes = []
+        for cluster in np.argsort(-self.counts, kind="stable"):
+            count = int(self.counts[cluster])
+            if count == 0:
+                continue
+            lead = self.centroids[cluster] - mean
+            archetypes.append({
+                "cluster": int(cluster),
+                "count": count,
+                "share": count / self.size,
+                "centroid": self.centroids[cluster],
+                "spread": float(np.sqrt(self.inertia[cluster] / count)),
+                "strengths": [self.dimensions[i] for i in np.argsort(-lead, kind="stable")[:strengths]],
+            })
+        return archetypes
+
+    def save(self, path):
+        """Writes the clusters to an .npz file, replacing it atomically."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f, dimensions=np.array(self.dimensions), centroids=self.centroids,
+                counts=self.counts, inertia=self.inertia, sums=self.sums,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, dimensions, k=CLUSTERS):
+        """Reads clusters saved by save(); returns empty clusters if the file is missing."""
+        if not os.path.exists(path):
+            return cls(dimensions, k)
+        with np.load(path) as data:
+            if tuple(data["dimensions"].tolist()) != tuple(dimensions):
+                raise ValueError(f"{path} holds clusters for different dimensions")
+            return cls(dimensions, centroids=data["centroids"], counts=data["counts"],
+                       inertia=data["inertia"], sums=data["sums"])
+
+
+class CohortStore(PeriodicFlusher):
+    """
+    Cohort clusters per question bank and class, persisted under `directory`.
+    Thread-safe; record() only buffers the profile.
+    """
+
+    def __init__(self, directory, k=CLUSTERS, flush_interval=FLUSH_INTERVAL):
+        self.directory = directory
+        self.k = k
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # By (bank fingerprint, cohort): the dimensions and the profiles not yet flushed
+        self._pending = {}
+        super().__init__(flush_interval, "cohorts-writer")
+
+    def _path(self, fingerprint, class_name):
+        return os.path.join(self.directory, fingerprint, f"{class_name}.npz")
+
+    def record(self, fingerprint, dimensions, class_name, normalized):
+        """
+        Adds a completed profile to its class's clusters, if it has a valid class,
+        and to the school-wide clusters.
+        """
+        profile = np.asarray(normalized, dtype=np.float64)
+        with self._lock:
+            for cohort in ([class_name] if valid_class_name(class_name) else []) + [SCHOOL]:
+                self._pending.setdefault((fingerprint, cohort), (tuple(dimensions), []))[1].append(profile)
+
+    def flush(self):
+        """Adds every buffered profile to its cohort's file."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for (fingerprint, cohort), (dimensions, profiles) in pending.items():
+            path = self._path(fingerprint, cohort)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with FileLock(f"{path}.lock"):
+                    clusters = CohortClusters.load(path, dimensions, self.k)
+                    clusters.add(np.array(profiles))
+                    clusters.save(path)
+            except (OSError, ValueError):
+                logger.exception("Could not update the cohort clusters in %s", path)
+                with self._lock:
+                    # Keep the profiles, ahead of any recorded since, for the next flush
+                    self._pending.setdefault((fingerprint, cohort), (dimensions, []))[1][:0] = profiles
+
+    def clusters(self, fingerprint, dimensions, class_name=SCHOOL):
+        """Returns the clusters of a class (the whole school by default)."""
+        return CohortClusters.load(self._path(fingerprint, class_name), dimensions, self.k)
+
+    def classes(self, fingerprint):
+        """Returns the names of the classes with completed profiles for a bank."""
+        try:
+            names = os.listdir(os.path.join(self.directory, fingerprint))
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-len(".npz")] for name in names if name.endswith(".npz") and name != f"{SCHOOL}.npz")
@@ -0,0 +1,262 @@
+# export_results.py
+
+"""
+Incremental columnar export of completed quizzes for warehouse analytics.
+
+Usage:
+    python -m jagged_quiz export jagged_quiz.db exports/ [--batch-rows N] [--grace SECONDS] [--bank FILE ...]
+                                 [--include-debug]
+
+Every run appends the sessions completed since the previous run to Parquet
+datasets, Hive-partitioned by completion date so pandas.read_parquet, pyarrow
+and DuckDB read them without conversion:
+
+    responses/date=YYYY-MM-DD/part-*.parquet
+        token string, question_index uint16, answer int8, answered_at timestamp,
+        debug bool
+    scores/bank=<fingerprint[:16]>/date=YYYY-MM-DD/part-*.parquet
+        token string, completed_at timestamp, debug bool, answered uint16 and
+        one float32 column of normalized scores per dimension of that bank
+
+Sessions completed by the app's debug tools (and so by load tests) have random
+answers and are skipped unless --include-debug is given; `debug` marks them.
+The setting applies to the sessions a run exports, so skipped ones are not
+picked up by later runs. Files written before the `debug` column existed lack
+it; read those datasets with union_by_name=true in DuckDB.
+
+Banks have different dimensions, so each scores/bank=... directory is a dataset
+of its own with its own columns. Read one bank at a time, e.g. in DuckDB
+read_parquet('exports/scores/bank=<fingerprint[:16]>/**/*.parquet',
+hive_partitioning=true); reading all of scores/ at once would either fail on the
+mismatched schemas or silently drop the columns of all but one bank.
+
+Scores are recomputed from the stored answers with the bank's QuizModel; banks
+are matched by fingerprint against the files in banks/ (and any --bank files),
+and sessions of bank versions that no longer exist get responses but no scores.
+Rows are streamed from SQLite and written in record batches of at most
+--batch-rows answers, so memory stays flat however much is exported. The
+completion time of the last exported session is kept in _export_state.json;
+sessions completed within the last --grace seconds wait for the next run, so
+write-behind writes still in flight elsewhere are not skipped.
+"""
+
+import json
+import os
+import sqlite3
+import time
+import uuid
+
+import numpy as np
+
+from quiz_bank import BankError, available_banks, bank_path, load_model
+
+STATE_FILE = "_export_state.json"
+DEFAULT_BATCH_ROWS = 200_000
+DEFAULT_GRACE_SECONDS = 60
+
+QUERY = """
+SELECT s.token, s.bank_fingerprint, s.completed_at, s.debug, a.question_index, a.answer, a.answered_at
+FROM sessions s JOIN answers a ON a.token = s.token
+WHERE s.completed_at > ? AND s.completed_at <= ? AND (? OR NOT s.debug) AND a.answer > 0
+ORDER BY s.completed_at, s.token
+"""
+
+
+def models_by_fingerprint(extra_banks=()):
+    """Compiles every bank in banks/ plus `extra_banks` (file paths) and returns them by fingerprint."""
+    models = {}
+    for path in [bank_path(name) for name in available_banks()] + list(extra_banks):
+        try:
+            model = load_model(path)
+        except BankError:
+            continue
+        models[model.fingerprint] = model
+    return models
+
+
+def _date(timestamp):
+    return time.strftime("%Y-%m-%d", time.gmtime(timestamp))
+
+
+class _PartitionedWriter:
+    """Keeps one Parquet file open per partition for the duration of an export run."""
+
+    def __init__(self, root, run_id):
+        self.root = root
+        self.run_id = run_id
+        self._writers = {}
+        self.files = []
+
+    def write(self, partition, table):
+        import pyarrow.parquet as pq
+
+        writer = self._writers.get(partition)
+        if writer is None:
+            directory = os.path.join(self.root, *partition)
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part-{self.run_id}.parquet.tmp")
+            writer = self._writers[partition] = pq.ParquetWriter(path, table.schema, compression="zstd")
+            self.files.append(path)
+        writer.write_table(table)
+
+    def close(self, commit=True):
+        """Closes every file; with commit, renames them into place, otherwise deletes them."""
+        for writer in self._writers.values():
+            writer.close()
+        for path in self.files:
+            if commit:
+                os.replace(path, path[:-len(".tmp")])
+            else:
+                os.remove(path)
+        self._writers.clear()
+
+
+def _read_state(out_dir):
+    try:
+        with open(os.path.join(out_dir, STATE_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"completed_through": 0.0}
+
+
+def _write_state(out_dir, state):
+    path = os.path.join(out_dir, STATE_FILE)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+def stream_sessions(cursor, batch_rows):
+    """
+    Yields lists of answer rows from a cursor ordered by session, each list ending
+    on a session boundary so no session is split across batches.
+    """
+    carry = []
+    while True:
+        rows = cursor.fetchmany(batch_rows)
+        if not rows:
+            if carry:
+                yield carry
+            return
+        rows = carry + rows
+        last_token = rows[-1][0]
+        split = len(rows)
+        while split > 0 and rows[split - 1][0] == last_token:
+            split -= 1
+        if split == 0:
+            # A single session larger than a batch; keep reading until it ends
+            carry = rows
+            continue
+        carry = rows[split:]
+        yield rows[:split]
+
+
+def _responses_table(tokens, question_index, answers, answered_at, debug):
+    import pyarrow as pa
+
+    return pa.table({
+        "token": pa.array(tokens, pa.string()),
+        "question_index": pa.array(question_index, pa.uint16()),
+        "answer": pa.array(answers, pa.int8()),
+        "answered_at": pa.array((answered_at * 1000).astype(np.int64), pa.timestamp("ms", tz="UTC")),
+        "debug": pa.array(debug, pa.bool_()),
+    })
+
+
+def _scores_table(model, tokens, completed_at, debug, answer_matrix):
+    import pyarrow as pa
+
+    _, _, normalized = model.score(answer_matrix)
+    columns = {
+        "token": pa.array(tokens, pa.string()),
+        "completed_at": pa.array((completed_at * 1000).astype(np.int64), pa.timestamp("ms", tz="UTC")),
+        "debug": pa.array(debug, pa.bool_()),
+        "answered": pa.array(np.count_nonzero(answer_matrix, axis=1), pa.uint16()),
+    }
+    for i, dim in enumerate(model.dimensions):
+        columns[dim] = pa.array(normalized[:, i].astype(np.float32), pa.float32(), mask=np.isnan(normalized[:, i]))
+    return pa.table(columns)
+
+
+def export_results(
+    db_path, out_dir, batch_rows=DEFAULT_BATCH_ROWS, grace_seconds=DEFAULT_GRACE_SECONDS, extra_banks=(), now=None,
+    include_debug=False,
+):
+    """
+    Appends the sessions completed since the last export to the Parquet datasets
+    under `out_dir`, leaving out debug completions unless `include_debug`. Returns
+    a summary dict with the number of sessions, answers and scored sessions
+    exported, and the new watermark.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    state = _read_state(out_dir)
+    since = state["completed_through"]
+    until = (time.time() if now is None else now) - grace_seconds
+    models = models_by_fingerprint(extra_banks)
+    run_id = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{uuid.uuid4().hex[:8]}"
+    responses = _PartitionedWriter(os.path.join(out_dir, "responses"), run_id)
+    scores = _PartitionedWriter(os.path.join(out_dir, "scores"), run_id)
+    summary = {"sessions": 0, "answers": 0, "scored_sessions": 0, "unknown_bank_sessions": 0}
+    watermark = since
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(QUERY, (since, until, include_debug))
+        for rows in stream_sessions(cursor, batch_rows):
+            tokens, fingerprints, completed, debug, question_index, answers, answered_at = zip(*rows)
+            tokens = np.array(tokens, dtype=object)
+            completed = np.array(completed, dtype=np.float64)
+            debug = np.array(debug, dtype=bool)
+            question_index = np.array(question_index, dtype=np.int64)
+            answers = np.array(answers, dtype=np.int8)
+            answered_at = np.array(answered_at, dtype=np.float64)
+            # Rows are ordered by session; each session starts where the token changes
+            starts = np.flatnonzero(np.r_[True, tokens[1:] != tokens[:-1]])
+            session_of_row = np.cumsum(np.r_[False, tokens[1:] != tokens[:-1]])
+            dates = np.array([_date(ts) for ts in completed[starts]])
+
+            for date in np.unique(dates):
+                in_date = dates[session_of_row] == date
+                responses.write(
+                    (f"date={date}",),
+                    _responses_table(
+                        tokens[in_date], question_index[in_date], answers[in_date], answered_at[in_date], debug[in_date],
+                    ),
+                )
+
+            session_fingerprints = np.array([fingerprints[i] for i in starts], dtype=object)
+            for fingerprint in np.unique(session_fingerprints):
+                model = models.get(fingerprint)
+                sessions = np.flatnonzero(session_fingerprints == fingerprint)
+                if model is None:
+                    summary["unknown_bank_sessions"] += len(sessions)
+                    continue
+                rows_mask = np.isin(session_of_row, sessions)
+                local_session = np.searchsorted(sessions, session_of_row[rows_mask])
+                valid = question_index[rows_mask] < len(model.questions)
+                matrix = np.zeros((len(sessions), len(model.questions)), dtype=np.int8)
+                matrix[local_session[valid], question_index[rows_mask][valid]] = answers[rows_mask][valid]
+                for date in np.unique(dates[sessions]):
+                    in_date = dates[sessions] == date
+                    first_rows = starts[sessions[in_date]]
+                    scores.write(
+                        (f"bank={fingerprint[:16]}", f"date={date}"),
+                        _scores_table(model, tokens[first_rows], completed[first_rows], debug[first_rows], matrix[in_date]),
+                    )
+                summary["scored_sessions"] += len(sessions)
+
+            summary["sessions"] += len(starts)
+            summary["answers"] += len(rows)
+            watermark = max(watermark, float(completed[-1]))
+    except BaseException:
+        responses.close(commit=False)
+        scores.close(commit=False)
+        raise
+    finally:
+        conn.close()
+
+    responses.close()
+    scores.close()
+    _write_state(out_dir, {"completed_through": watermark, "last_run": run_id})
+    summary["completed_through"] = watermark
+    return summary
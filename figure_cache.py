@@ -0,0 +1,95 @@
+# figure_cache.py
+
+"""
+Process-wide LRU cache for rendered result figures.
+
+Results figures depend only on a profile's scores, which the results page shows
+rounded to two decimals, so profiles that round to the same scores share their
+figures. Entries are Plotly figure JSON strings; the cache is bounded both by
+entry count and by total JSON size, and entries expire after a time-to-live.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Scores are quantized to the precision shown on the results page
+SCORE_DECIMALS = 2
+
+
+def profile_cache_key(bank_fingerprint, normalized):
+    """
+    Returns a hashable key for a normalized score vector over DIMENSIONS, rounded
+    to SCORE_DECIMALS, with None for unscored dimensions.
+    """
+    rounded = np.round(np.asarray(normalized, dtype=np.float64), SCORE_DECIMALS)
+    return (bank_fingerprint,) + tuple(None if np.isnan(score) else float(score) for score in rounded)
+
+
+class FigureCache:
+    """A thread-safe LRU of serialized figures, limited by entries, bytes and age."""
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Returns the cached JSON for `key`, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] > self.ttl:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, figure_json):
+        """Stores figure JSON under `key`, evicting least recently used entries as needed."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if len(figure_json) > self.max_bytes:
+                return
+            self._entries[key] = (figure_json, time.monotonic())
+            self.size_bytes += len(figure_json)
+            while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_build(self, key, build):
+        """Returns the cached JSON for `key`, calling `build()` to create it on a miss."""
+        figure_json = self.get(key)
+        if figure_json is None:
+            figure_json = build()
+            self.put(key, figure_json)
+        return figure_json
+
+    def _remove(self, key):
+        figure_json, _ = self._entries.pop(key)
+        self.size_bytes -= len(figure_json)
+
+    def stats(self):
+        """Returns hit/miss counters and current residency."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size_bytes": self.size_bytes,
+            }
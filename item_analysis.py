@@ -0,0 +1,314 @@
+# item_analysis.py
+
+"""
+Streaming psychometric item analysis of a question bank's answers.
+
+Usage:
+    python -m jagged_quiz items [--bank FILE] [--norms-dir DIR] [--from-db DB [--save]] [--json FILE]
+
+ItemStats keeps the sufficient statistics of every item pair over all completed
+submissions, as (Q x Q) integer matrices: how many submissions answered both
+items, the sum and sum of squares of each item's answers over those submissions,
+and the cross-products of the two answers. Unanswered items (0) are left out
+pairwise, so adaptive quizzes that skip items still count. A submission updates
+the matrices with four (Q x Q) outer products, a batch with four matrix
+products, and two sets of statistics merge by addition, so the report never
+rescans history and workers can accumulate separately.
+
+From these come the item means and standard deviations, pairwise inter-item
+correlations, and, over the covariance matrix, per dimension (the items whose
+primary dimension it is):
+  - Cronbach's alpha, and alpha with each item deleted;
+  - each item's corrected item-total correlation (with the sum of the dimension's
+    other items), the usual test of whether an item discriminates;
+and per item and dimension, the correlation of the item with the weighted score of
+every dimension excluding the item's own contribution, to check secondary_weights
+against the data.
+
+ItemStatsStore accumulates the submissions of the running app per bank in
+<directory>/<bank fingerprint>.items.npz, flushed like the score norms: each
+process buffers a delta and merges it into the file under a file lock.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from norms import FLUSH_INTERVAL, FileLock, PeriodicFlusher
+
+# Items with a corrected item-total correlation below this discriminate poorly
+MIN_ITEM_TOTAL_CORRELATION = 0.2
+
+logger = logging.getLogger(__name__)
+
+
+class ItemStats:
+    """Mergeable pairwise sufficient statistics of a bank's item answers."""
+
+    FIELDS = ("counts", "sums", "squares", "cross")
+
+    def __init__(self, n_items, counts=None, sums=None, squares=None, cross=None):
+        self.n_items = n_items
+        shape = (n_items, n_items)
+        # counts[i, j]: submissions answering both i and j; sums[i, j] and squares[i, j]:
+        # sum and sum of squares of item i's answers in them; cross[i, j]: sum of x_i * x_j
+        self.counts = np.zeros(shape, dtype=np.int64) if counts is None else counts
+        self.sums = np.zeros(shape, dtype=np.int64) if sums is None else sums
+        self.squares = np.zeros(shape, dtype=np.int64) if squares is None else squares
+        self.cross = np.zeros(shape, dtype=np.int64) if cross is None else cross
+        for field in self.FIELDS:
+            if getattr(self, field).shape != shape:
+                raise ValueError(f"expected {field} of shape {shape}, got {getattr(self, field).shape}")
+
+    @property
+    def submissions(self):
+        """Number of submissions, counted on the most answered item."""
+        return int(self.counts.diagonal().max()) if self.n_items else 0
+
+    def add(self, answers):
+        """Adds one submission's answers (Q,) or a batch (N x Q); 0 means unanswered."""
+        answers = np.atleast_2d(np.asarray(answers, dtype=np.float64))
+        answered = (answers > 0).astype(np.float64)
+        # Float products go through BLAS; every entry is a whole number well below
+        # 2**53, so rounding back to integers is exact
+        self.counts += np.rint(answered.T @ answered).astype(np.int64)
+        self.sums += np.rint(answers.T @ answered).astype(np.int64)
+        self.squares += np.rint((answers ** 2).T @ answered).astype(np.int64)
+        self.cross += np.rint(answers.T @ answers).astype(np.int64)
+
+    def merge(self, other):
+        """Adds another set of statistics over the same items into this one."""
+        if other.n_items != self.n_items:
+            raise ValueError("cannot merge item statistics over different items")
+        for field in self.FIELDS:
+            total = getattr(self, field)
+            total += getattr(other, field)
+        return self
+
+    def clear(self):
+        for field in self.FIELDS:
+            getattr(self, field)[:] = 0
+
+    def any(self):
+        return bool(self.counts.any())
+
+    def means(self):
+        n = self.counts.diagonal()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.sums.diagonal() / n
+
+    def covariance(self):
+        """
+        Returns the (Q x Q) item covariance matrix, each entry over the submissions
+        answering both items (NaN with fewer than two).
+        """
+        n = self.counts.astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = (self.cross - self.sums * self.sums.T / n) / (n - 1)
+        return np.where(n > 1, cov, np.nan)
+
+    def correlations(self):
+        """Returns the (Q x Q) pairwise Pearson correlations between items."""
+        n = self.counts.astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = self.cross - self.sums * self.sums.T / n
+            # Each item's sum of squared deviations over the submissions answering both
+            ss = self.squares - self.sums ** 2 / n
+            corr = cov / np.sqrt(ss * ss.T)
+        return np.where((n > 1) & (ss > 0) & (ss.T > 0), corr, np.nan)
+
+    def save(self, path):
+        """Writes the statistics to an .npz file, replacing it atomically."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **{field: getattr(self, field) for field in self.FIELDS})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, n_items):
+        """Reads statistics saved by save(); returns empty statistics if the file is missing."""
+        if not os.path.exists(path):
+            return cls(n_items)
+        with np.load(path) as data:
+            return cls(n_items, **{field: data[field].astype(np.int64) for field in cls.FIELDS})
+
+
+def _alpha(cov):
+    """Cronbach's alpha of the sum of the items with covariance matrix `cov`."""
+    k = len(cov)
+    total_variance = cov.sum()
+    if k < 2 or not total_variance > 0:
+        return np.nan
+    return k / (k - 1) * (1 - np.trace(cov) / total_variance)
+
+
+def analyze(model, stats):
+    """
+    Returns the item analysis of a bank's statistics as a JSON-serializable dict:
+    "submissions", per dimension "dimensions" (alpha and items), per item "items"
+    (mean, sd, answered, item-total correlation, alpha if deleted and the
+    correlation with every dimension's score), "correlations" (the Q x Q inter-item
+    matrix) and "weak_items", the items below MIN_ITEM_TOTAL_CORRELATION. NaN
+    statistics are reported as None.
+    """
+    cov = stats.covariance()
+    variances = cov.diagonal()
+    means = stats.means()
+    primary = np.array([model.dimension_index[q["primary_dimension"]] for q in model.questions])
+
+    items = [
+        {
+            "index": i,
+            "question": q["question"],
+            "primary_dimension": q["primary_dimension"],
+            "answered": int(stats.counts[i, i]),
+            "mean": float(means[i]),
+            "sd": float(np.sqrt(variances[i])),
+            "item_total_r": np.nan,
+            "alpha_if_deleted": np.nan,
+        }
+        for i, q in enumerate(model.questions)
+    ]
+
+    dimensions = {}
+    for d, dim in enumerate(model.dimensions):
+        members = np.flatnonzero(primary == d)
+        block = cov[np.ix_(members, members)]
+        dimensions[dim] = {"items": members.tolist(), "alpha": float(_alpha(block))}
+        for position, i in enumerate(members):
+            others = np.delete(np.arange(len(members)), position)
+            rest = block[np.ix_(others, others)]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                items[i]["item_total_r"] = float(block[position, others].sum() / np.sqrt(variances[i] * rest.sum()))
+            items[i]["alpha_if_deleted"] = float(_alpha(rest))
+
+    # Correlation of each item with each dimension's weighted score, leaving out the
+    # item's own contribution to that score
+    weights = np.asarray(model.weights, dtype=np.float64)
+    item_score_cov = cov @ weights
+    score_variances = np.einsum("id,ij,jd->d", weights, cov, weights)
+    own = weights * variances[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rest_cov = item_score_cov - own
+        rest_var = score_variances[None, :] - 2 * weights * item_score_cov + weights ** 2 * variances[:, None]
+        dimension_r = rest_cov / np.sqrt(variances[:, None] * rest_var)
+    dimension_r = np.where(rest_var > 0, dimension_r, np.nan)
+    for i, item in enumerate(items):
+        item["dimension_r"] = dict(zip(model.dimensions, dimension_r[i].tolist()))
+
+    weak = [item["index"] for item in items if item["item_total_r"] < MIN_ITEM_TOTAL_CORRELATION]
+    report = {
+        "title": model.title,
+        "bank": model.fingerprint,
+        "submissions": stats.submissions,
+        "dimensions": dimensions,
+        "items": items,
+        "correlations": stats.correlations().tolist(),
+        "weak_items": weak,
+    }
+    return _none_for_nan(report)
+
+
+def _none_for_nan(value):
+    if isinstance(value, float):
+        return None if np.isnan(value) else value
+    if isinstance(value, dict):
+        return {key: _none_for_nan(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_none_for_nan(item) for item in value]
+    return value
+
+
+def format_report(report):
+    """Formats an analyze() report as a plain-text table per dimension."""
+    def number(value, spec):
+        return "–" if value is None else format(value, spec)
+
+    lines = [f"Item analysis of {report['title'] or report['bank'][:16]}: {report['submissions']} submissions", ""]
+    items = report["items"]
+    for dim, summary in report["dimensions"].items():
+        lines.append(f"{dim}: alpha {number(summary['alpha'], '.3f')} ({len(summary['items'])} items)")
+        lines.append(f"  {'item':>5} {'answered':>9} {'mean':>6} {'sd':>6} {'r(it)':>7} {'alpha-del':>9}")
+        for i in summary["items"]:
+            item = items[i]
+            lines.append(
+                f"  {'q' + str(i):>5} {item['answered']:>9} {number(item['mean'], '6.2f')} {number(item['sd'], '6.2f')} "
+                f"{number(item['item_total_r'], '7.3f')} {number(item['alpha_if_deleted'], '9.3f')}"
+            )
+        lines.append("")
+    if report["weak_items"]:
+        lines.append(f"Items with corrected item-total r < {MIN_ITEM_TOTAL_CORRELATION}:")
+        for i in report["weak_items"]:
+            lines.append(f"  q{i}: {items[i]['question']}")
+    return "\n".join(lines)
+
+
+def stats_from_database(db_path, model, batch_rows=200_000):
+    """
+    Builds a bank's statistics from every completed submission in the app's SQLite
+    response store, streaming the answers in batches of about `batch_rows` rows.
+    Sessions completed by the debug tools are left out.
+    """
+    from export_results import stream_sessions
+
+    stats = ItemStats(len(model.questions))
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(
+            "SELECT a.token, a.question_index, a.answer FROM answers a JOIN sessions s ON s.token = a.token "
+            "WHERE s.bank_fingerprint = ? AND s.completed_at IS NOT NULL AND NOT s.debug AND a.answer > 0 "
+            "AND a.question_index < ? ORDER BY a.token",
+            (model.fingerprint, len(model.questions)),
+        )
+        for rows in stream_sessions(cursor, batch_rows):
+            tokens, question_index, answers = (np.array(column) for column in zip(*rows))
+            session = np.cumsum(np.r_[False, tokens[1:] != tokens[:-1]])
+            batch = np.zeros((session[-1] + 1, len(model.questions)), dtype=np.int8)
+            batch[session, question_index] = answers
+            stats.add(batch)
+    finally:
+        conn.close()
+    return stats
+
+
+class ItemStatsStore(PeriodicFlusher):
+    """
+    Process-wide item statistics per question bank, persisted under `directory`
+    as <bank fingerprint>.items.npz. Thread-safe; record() only updates memory.
+    """
+
+    def __init__(self, directory, flush_interval=FLUSH_INTERVAL):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._deltas = {}
+        super().__init__(flush_interval, "item-stats-writer")
+
+    def path(self, fingerprint):
+        return os.path.join(self.directory, f"{fingerprint}.items.npz")
+
+    def record(self, fingerprint, answers):
+        """Adds a completed submission's answers (Q,) to its bank's statistics."""
+        with self._lock:
+            delta = self._deltas.get(fingerprint)
+            if delta is None:
+                delta = self._deltas[fingerprint] = ItemStats(len(answers))
+            delta.add(answers)
+
+    def flush(self):
+        """Merges every local delta into its file."""
+        with self._lock:
+            pending, self._deltas = self._deltas, {}
+        for fingerprint, delta in pending.items():
+            path = self.path(fingerprint)
+            try:
+                with FileLock(f"{path}.lock"):
+                    ItemStats.load(path, delta.n_items).merge(delta).save(path)
+            except (OSError, ValueError):
+                logger.exception("Could not update the item statistics in %s", path)
+                with self._lock:
+                    current = self._deltas.setdefault(fingerprint, ItemStats(delta.n_items))
+                    current.merge(delta)
@@ -1,11 +1,71 @@
 # jagged_quiz_app.py
 
+import sys
+
+# `python -m jagged_quiz score ...` runs the headless batch scorer instead of the UI.
+# Under `streamlit run`, Streamlit is already loaded before this script executes.
+if __name__ == "__main__" and "streamlit" not in sys.modules:
+    import runpy
+    runpy.run_module("batch_scoring", run_name="__main__", alter_sys=True)
+    sys.exit()
+
+import collections
+import json
+import logging
+import os
+import secrets
+
 import streamlit as st
-import pandas as pd
-import random
-import plotly.graph_objects as go
-import networkx as nx
-import math
+import numpy as np
+
+# pandas, plotly and networkx are only used on the results page and are imported
+# there on first use through lazy_import, so the quiz page starts without them.
+from lazy_imports import LAZY_MODULES, import_status, lazy_import
+
+# --- 1. Question bank and scoring model ---
+from quiz_bank import DEFAULT_BANK_PATH, MODEL_CACHE, BankError, bank_path, load_model
+from scoring import ANSWER_OPTIONS, ANSWER_VALUES, MAX_ANSWER, ScoreAccumulator, top_dimensions
+from response_store import ResponseStore
+from figure_cache import FigureCache, profile_cache_key
+from charts import compute_dimension_layout, create_archetype_heatmap, create_network_chart, create_radar_chart
+from profiler import PROFILER, MetricsExporter
+from adaptive import DEFAULT_CONFIDENCE, AdaptiveSelector
+from norms import NormsStore
+from peers import PeerStore, owner_id
+from cohorts import SCHOOL, CohortStore
+from item_analysis import ItemStatsStore
+from reports import REPORT_FORMATS, ReportQueue, report_key, report_payload
+from scoring_client import ScoringClient, ScoringServiceError
+
+# Quizzes are chosen with the `quiz` query parameter, naming a bank in banks/; without
+# it this bank file is served. Bank edits are picked up by new sessions without a restart.
+DEFAULT_QUESTION_BANK_PATH = os.environ.get("JAGGED_QUIZ_BANK", DEFAULT_BANK_PATH)
+# Sessions and answers are persisted to this SQLite database
+DATABASE_PATH = os.environ.get("JAGGED_QUIZ_DB", "jagged_quiz.db")
+# Percentile norms of completed profiles, and the item statistics of their answers
+# (see item_analysis.py), are kept per question bank in this directory
+NORMS_DIR = os.environ.get("JAGGED_QUIZ_NORMS_DIR", "norms")
+# Completed profiles are indexed per question bank in this directory for "students like you"
+PEERS_DIR = os.environ.get("JAGGED_QUIZ_PEERS_DIR", "peers")
+# Learner archetypes are clustered per question bank and class in this directory; the
+# class comes from the `class` query parameter
+COHORTS_DIR = os.environ.get("JAGGED_QUIZ_COHORTS_DIR", "cohorts")
+# Rendered profile reports are cached in this directory, named by content hash
+REPORTS_DIR = os.environ.get("JAGGED_QUIZ_REPORTS_DIR", "reports")
+# In adaptive mode each next question is the one that best settles the top strengths,
+# and the quiz can be submitted as soon as they are stable at ADAPTIVE_CONFIDENCE
+ADAPTIVE_QUESTIONS = os.environ.get("JAGGED_QUIZ_ADAPTIVE", "0") == "1"
+ADAPTIVE_CONFIDENCE = float(os.environ.get("JAGGED_QUIZ_ADAPTIVE_CONFIDENCE", DEFAULT_CONFIDENCE))
+# In client mode the results page gets scores and career matches from the scoring
+# service (scoring_service.py) at this URL, falling back to local scoring if it fails
+SCORING_SERVICE_URL = os.environ.get("JAGGED_QUIZ_SCORING_URL")
+# Stage timings and cache counters are exported every METRICS_INTERVAL seconds as a
+# Prometheus text file and/or a JSON lines log when these paths are set
+METRICS_FILE = os.environ.get("JAGGED_QUIZ_METRICS_FILE")
+METRICS_LOG = os.environ.get("JAGGED_QUIZ_METRICS_LOG")
+METRICS_INTERVAL = float(os.environ.get("JAGGED_QUIZ_METRICS_INTERVAL", 10))
+
+logger = logging.getLogger(__name__)
 
 # Set page configuration for a clean, wide layout with a collapsed sidebar
 st.set_page_config(
@@ -14,418 +74,285 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# --- 1. Data Definitions (a more robust structure using a list of dictionaries) ---
-# Each question is a dictionary with clear keys for its properties.
-QUESTIONS_DATA = [
-    {
-        "question": "I enjoy observing animals, plants, or natural environments.",
-        "primary_dimension": "Nature & Environment",
-        "secondary_weights": {"Scientific Curiosity": 0.4},
-    },
-    {
-        "question": "I am curious about how ecosystems and the Earth work.",
-        "primary_dimension": "Nature & Environment",
-        "secondary_weights": {"Scientific Curiosity": 0.4},
-    },
-    {
-        "question": "I like learning about environmental problems and ways to solve them.",
-        "primary_dimension": "Nature & Environment",
-        "secondary_weights": {"Critical & Reflective Thinking": 0.3},
-    },
-    {
-        "question": "I feel motivated to protect nature or wildlife.",
-        "primary_dimension": "Nature & Environment",
-        "secondary_weights": {"Emotional & Social Intelligence": 0.3},
-    },
-    # Numbers & Logic
-    {
-        "question": "I enjoy solving puzzles or logic problems.",
-        "primary_dimension": "Numbers & Logic",
-        "secondary_weights": {"Critical & Reflective Thinking": 0.4},
-    },
-    {
-        "question": "I like spotting patterns or trends in numbers or data.",
-        "primary_dimension": "Numbers & Logic",
-        "secondary_weights": {"Scientific Curiosity": 0.4},
-    },
-    {
-        "question": "I feel confident analyzing information to make decisions.",
-        "primary_dimension": "Numbers & Logic",
-        "secondary_weights": {"Critical & Reflective Thinking": 0.5},
-    },
-    {
-        "question": "I enjoy planning and strategizing in games or projects.",
-        "primary_dimension": "Numbers & Logic",
-        "secondary_weights": {"Entrepreneurship & Initiative": 0.3},
-    },
-    # Words & Communication
-    {
-        "question": "I enjoy writing stories, essays, or articles.",
-        "primary_dimension": "Words & Communication",
-        "secondary_weights": {"Arts & Creativity": 0.4},
-    },
-    {
-        "question": "I like explaining ideas clearly so others understand them.",
-        "primary_dimension": "Words & Communication",
-        "secondary_weights": {"Emotional & Social Intelligence": 0.3},
-    },
-    {
-        "question": "I am interested in how words and language influence people.",
-        "primary_dimension": "Words & Communication",
-        "secondary_weights": {"Critical & Reflective Thinking": 0.3},
-    },
-    {
-        "question": "I enjoy sharing my ideas through speeches, blogs, or media.",
-        "primary_dimension": "Words & Communication",
-        "secondary_weights": {"Digital Media & Creativity": 0.4},
-    },
-    # People & Community
-    {
-        "question": "I enjoy helping others overcome challenges or learn new skills.",
-        "primary_dimension": "People & Community",
-        "secondary_weights": {"Emotional & Social Intelligence": 0.5},
-    },
-    {
-        "question": "I like working collaboratively to achieve a shared goal.",
-        "primary_dimension": "People & Community",
-        "secondary_weights": {"Collaborative & Leadership Skills": 0.4},
-    },
-    {
-        "question": "I am curious about understanding how people think and feel.",
-        "primary_dimension": "People & Community",
-        "secondary_weights": {"Emotional & Social Intelligence": 0.5},
-    },
-    {
-        "question": "I feel motivated to make a positive difference in my community.",
-        "primary_dimension": "People & Community",
-        "secondary_weights": {"Mindfulness & Wellbeing": 0.3},
-    },
-    # Making & Building
-    {
-        "question": "I enjoy designing or creating objects or systems.",
-        "primary_dimension": "Making & Building",
-        "secondary_weights": {"Technology & Innovation": 0.4},
-    },
-    {
-        "question": "I like improving or fixing things to make them work better.",
-        "primary_dimension": "Making & Building",
-        "secondary_weights": {"Critical & Reflective Thinking": 0.3},
-    },
-    {
-        "question": "I feel proud when I complete a hands-on project.",
-        "primary_dimension": "Making & Building",
-        "secondary_weights": {"Mindfulness & Wellbeing": 0.3},
-    },
-    {
-        "question": "I enjoy experimenting with ideas to create new things.",
-        "primary_dimension": "Making & Building",
-        "secondary_weights": {"Entrepreneurship & Initiative": 0.4},
-    },
-    # Movement & Health
-    {
-        "question": "I enjoy physical activities that challenge my body.",
-        "primary_dimension": "Movement & Health",
-        "secondary_weights": {"Mindfulness & Wellbeing": 0.3},
-    },
-    {
-        "question": "I am interested in learning how the body works and stays healthy.",
-        "primary_dimension": "Movement & Health",
-        "secondary_weights": {"Scientific Curiosity": 0.3},
-    },
-    {
-        "question": "I like setting goals to improve my fitness or skills.",
-        "primary_dimension": "Movement & Health",
-        "secondary_weights": {"Mindfulness & Wellbeing": 0.4},
-    },
-    {
-        "question": "I feel energized by sports, dance, or other active challenges.",
-        "primary_dimension": "Movement & Health",
-        "secondary_weights": {"Emotional & Social Intelligence": 0.3},
-    },
-    # Arts & Creativity
-    {
-        "question": "I enjoy creating art, music, or performance projects.",
-        "primary_dimension": "Arts & Creativity",
-        "secondary_weights": {"Digital Media & Creativity": 0.4},
-    },
-    {
-        "question": "I like coming up with original ideas or new ways of doing things.",
-        "primary_dimension": "Arts & Creativity",
-        "secondary_weights": {"Entrepreneurship & Initiative": 0.4},
-    },
-    {
-        "question": "I enjoy experimenting with styles, colors, or artistic techniques.",
-        "primary_dimension": "Arts & Creativity",
-        "secondary_weights": {"Critical & Reflective Thinking": 0.3},
-    },
-    {
-        "question": "I feel inspired when imagining or designing something new.",
-        "primary_dimension": "Arts & Creativity",
-        "secondary_weights": {"Mindfulness & Wellbeing": 0.3},
-    },
-    # Technology & Innovation
-    {
-        "question": "I enjoy learning how technology, gadgets, or software work.",
-        "primary_dimension": "Technology & Innovation",
-        "secondary_weights": {"Scientific Curiosity": 0.4},
-    },
-    {
-        "question": "I like thinking of ways technology can solve real problems.",
-        "primary_dimension": "Technology & Innovation",
-        "secondary_weights": {"Entrepreneurship & Initiative": 0.4},
-    },
-    {
-        "question": "I enjoy experimenting with coding, robotics, or digital tools.",
-        "primary_dimension": "Technology & Innovation",
-        "secondary_weights": {"Digital Media & Creativity": 0.4},
-    },
-    {
-        "question": "I am curious about inventing or improving technological solutions.",
-        "primary_dimension": "Technology & Innovation",
-        "secondary_weights": {"Critical & Reflective Thinking": 0.3},
-    },
-    # Entrepreneurship & Initiative
-    {
-        "question": "I enjoy creating projects or small ventures from an idea.",
-        "primary_dimension": "Entrepreneurship & Initiative",
-        "secondary_weights": {"Critical & Reflective Thinking": 0.3},
-    },
-    {
-        "question": "I like taking the lead in solving challenges or making improvements.",
-        "primary_dimension": "Entrepreneurship & Initiative",
-        "secondary_weights": {"Collaborative & Leadership Skills": 0.4},
-    },
-    {
-        "question": "I feel motivated to try new approaches or take calculated risks.",
-        "primary_dimension": "Entrepreneurship & Initiative",
-        "secondary_weights": {"Mindfulness & Wellbeing": 0.3},
-    },
-    {
-        "question": "I enjoy finding creative solutions to everyday problems.",
-        "primary_dimension": "Entrepreneurship & Initiative",
-        "secondary_weights": {"Critical & Reflective Thinking": 0.4},
-    },
-    # Critical & Reflective Thinking
-    {
-        "question": "I enjoy analyzing why things work the way they do.",
-        "primary_dimension": "Critical & Reflective Thinking",
-        "secondary_weights": {"Scientific Curiosity": 0.4},
-    },
-    {
-        "question": "I like questioning assumptions to better understand a topic.",
-        "primary_dimension": "Critical & Reflective Thinking",
-        "secondary_weights": {"Numbers & Logic": 0.3},
-    },
-    {
-        "question": "I enjoy comparing different viewpoints before forming an opinion.",
-        "primary_dimension": "Critical & Reflective Thinking",
-        "secondary_weights": {"Emotional & Social Intelligence": 0.3},
-    },
-    {
-        "question": "I reflect on my decisions to see how I could improve them.",
-        "primary_dimension": "Critical & Reflective Thinking",
-        "secondary_weights": {"Mindfulness & Wellbeing": 0.4},
-    },
-    # Emotional & Social Intelligence
-    {
-        "question": "I notice how my actions affect other people.",
-        "primary_dimension": "Emotional & Social Intelligence",
-        "secondary_weights": {"People & Community": 0.4},
-    },
-    {
-        "question": "I enjoy helping friends solve personal or emotional challenges.",
-        "primary_dimension": "Emotional & Social Intelligence",
-        "secondary_weights": {"People & Community": 0.5},
-    },
-    {
-        "question": "I can understand someone else’s perspective easily.",
-        "primary_dimension": "Emotional & Social Intelligence",
-        "secondary_weights": {"Critical & Reflective Thinking": 0.3},
-    },
-    {
-        "question": "I am aware of my feelings and can manage them well.",
-        "primary_dimension": "Emotional & Social Intelligence",
-        "secondary_weights": {"Mindfulness & Wellbeing": 0.4},
-    },
-    # Digital Media & Creativity
-    {
-        "question": "I enjoy creating videos, music, or digital artwork.",
-        "primary_dimension": "Digital Media & Creativity",
-        "secondary_weights": {"Arts & Creativity": 0.4},
-    },
-    {
-        "question": "I like experimenting with apps or tools to express myself creatively.",
-        "primary_dimension": "Digital Media & Creativity",
-        "secondary_weights": {"Technology & Innovation": 0.4},
-    },
-    {
-        "question": "I am interested in designing or editing digital content.",
-        "primary_dimension": "Digital Media & Creativity",
-        "secondary_weights": {"Entrepreneurship & Initiative": 0.3},
-    },
-    {
-        "question": "I enjoy combining technology and imagination to make something new.",
-        "primary_dimension": "Digital Media & Creativity",
-        "secondary_weights": {"Critical & Reflective Thinking": 0.3},
-    },
-    # Scientific Curiosity
-    {
-        "question": "I enjoy designing experiments to see what happens.",
-        "primary_dimension": "Scientific Curiosity",
-        "secondary_weights": {"Critical & Reflective Thinking": 0.4},
-    },
-    {
-        "question": "I ask questions to understand how things in nature or science work.",
-        "primary_dimension": "Scientific Curiosity",
-        "secondary_weights": {"Nature & Environment": 0.4},
-    },
-    {
-        "question": "I enjoy observing phenomena carefully and recording what I see.",
-        "primary_dimension": "Scientific Curiosity",
-        "secondary_weights": {"Critical & Reflective Thinking": 0.3},
-    },
-    {
-        "question": "I like testing ideas to see if they really work.",
-        "primary_dimension": "Scientific Curiosity",
-        "secondary_weights": {"Entrepreneurship & Initiative": 0.3},
-    },
-    # Collaborative & Leadership Skills
-    {
-        "question": "I enjoy organizing group activities or projects.",
-        "primary_dimension": "Collaborative & Leadership Skills",
-        "secondary_weights": {"People & Community": 0.4},
-    },
-    {
-        "question": "I like guiding others to achieve a shared goal.",
-        "primary_dimension": "Collaborative & Leadership Skills",
-        "secondary_weights": {"Entrepreneurship & Initiative": 0.3},
-    },
-    {
-        "question": "I feel confident taking responsibility for team decisions.",
-        "primary_dimension": "Collaborative & Leadership Skills",
-        "secondary_weights": {"Mindfulness & Wellbeing": 0.3},
-    },
-    {
-        "question": "I enjoy helping a group work together smoothly.",
-        "primary_dimension": "Collaborative & Leadership Skills",
-        "secondary_weights": {"Emotional & Social Intelligence": 0.4},
-    },
-    # Mindfulness & Wellbeing
-    {
-        "question": "I enjoy practicing mindfulness or reflecting on my feelings.",
-        "primary_dimension": "Mindfulness & Wellbeing",
-        "secondary_weights": {"Emotional & Social Intelligence": 0.4},
-    },
-    {
-        "question": "I pay attention to my wellbeing and daily habits.",
-        "primary_dimension": "Mindfulness & Wellbeing",
-        "secondary_weights": {"Movement & Health": 0.4},
-    },
-    {
-        "question": "I can stay focused and calm even in challenging situations.",
-        "primary_dimension": "Mindfulness & Wellbeing",
-        "secondary_weights": {"Critical & Reflective Thinking": 0.3},
-    },
-    {
-        "question": "I take time to think about my strengths and areas I want to improve.",
-        "primary_dimension": "Mindfulness & Wellbeing",
-        "secondary_weights": {"Critical & Reflective Thinking": 0.4},
-    },
-]
-
-# A set of all unique dimensions for initialization
-DIMENSIONS = sorted(list(set([q["primary_dimension"] for q in QUESTIONS_DATA] + [dim for q in QUESTIONS_DATA for dim in q["secondary_weights"]])))
-
-# Sample career paths data to avoid KeyError
-LEARNING_PATHS_AND_CAREERS = {
-    "Nature & Environment": {
-        "learning": ["Biology", "Environmental Science", "Geography"],
-        "careers": ["Ecologist", "Conservationist", "Urban Planner"],
-    },
-    "Numbers & Logic": {
-        "learning": ["Mathematics", "Computer Science", "Engineering"],
-        "careers": ["Data Scientist", "Software Engineer", "Actuary"],
-    },
-    "Words & Communication": {
-        "learning": ["English Literature", "Journalism", "Public Speaking"],
-        "careers": ["Journalist", "Marketing Manager", "Lawyer"],
-    },
-    "People & Community": {
-        "learning": ["Sociology", "Psychology", "Social Work"],
-        "careers": ["Teacher", "Therapist", "Human Resources Manager"],
-    },
-    "Making & Building": {
-        "learning": ["Mechanical Engineering", "Industrial Design", "Architecture"],
-        "careers": ["Architect", "Product Designer", "Construction Manager"],
-    },
-    "Movement & Health": {
-        "learning": ["Kinesiology", "Nutrition", "Sports Medicine"],
-        "careers": ["Physical Therapist", "Athletic Trainer", "Fitness Coach"],
-    },
-    "Arts & Creativity": {
-        "learning": ["Fine Arts", "Music Theory", "Creative Writing"],
-        "careers": ["Graphic Designer", "Musician", "Artist"],
-    },
-    "Technology & Innovation": {
-        "learning": ["Computer Science", "Robotics", "Cybersecurity"],
-        "careers": ["UX/UI Designer", "Robotics Engineer", "Data Analyst"],
-    },
-    "Entrepreneurship & Initiative": {
-        "learning": ["Business Management", "Marketing", "Economics"],
-        "careers": ["Startup Founder", "Project Manager", "Product Manager"],
-    },
-    "Critical & Reflective Thinking": {
-        "learning": ["Philosophy", "Debate", "Research Methods"],
-        "careers": ["Researcher", "Strategist", "Consultant"],
-    },
-    "Emotional & Social Intelligence": {
-        "learning": ["Psychology", "Counseling", "Mediation"],
-        "careers": ["Counselor", "Human Resources Specialist", "Educator"],
-    },
-    "Digital Media & Creativity": {
-        "learning": ["Graphic Design", "Digital Marketing", "Animation"],
-        "careers": ["Social Media Manager", "Video Editor", "Web Developer"],
-    },
-    "Scientific Curiosity": {
-        "learning": ["Physics", "Chemistry", "Astronomy"],
-        "careers": ["Scientist", "Lab Technician", "Medical Doctor"],
-    },
-    "Collaborative & Leadership Skills": {
-        "learning": ["Leadership Studies", "Team Management", "Project Planning"],
-        "careers": ["Team Lead", "Manager", "Community Organizer"],
-    },
-    "Mindfulness & Wellbeing": {
-        "learning": ["Mindfulness Training", "Yoga", "Personal Development"],
-        "careers": ["Wellness Coach", "Life Coach", "Therapist"],
-    },
-}
+# Times the whole script run; reruns cut short by st.rerun() or st.stop() are not counted
+rerun_timer = PROFILER.stage("rerun").start()
+
+
+@st.cache_resource(show_spinner=False)
+def get_response_store(path):
+    """Returns the process-wide response store, whose writer thread is shared by all sessions."""
+    return ResponseStore(path)
+
+response_store = get_response_store(DATABASE_PATH)
+
+@st.cache_resource(show_spinner=False)
+def get_figure_cache():
+    """Returns the process-wide cache of rendered result figures, shared by all sessions."""
+    return FigureCache()
+
+figure_cache = get_figure_cache()
+
+@st.cache_resource(show_spinner=False)
+def get_norms_store(directory):
+    """Returns the process-wide percentile norms, merged with other processes' in the background."""
+    return NormsStore(directory)
+
+norms_store = get_norms_store(NORMS_DIR)
+
+@st.cache_resource(show_spinner=False)
+def get_item_stats_store(directory):
+    """Returns the process-wide item statistics, merged into the shared files in the background."""
+    return ItemStatsStore(directory)
+
+item_stats_store = get_item_stats_store(NORMS_DIR)
+
+@st.cache_resource(show_spinner=False)
+def get_peer_store(directory):
+    """Returns the process-wide index of completed profiles, shared by all sessions."""
+    return PeerStore(directory)
+
+peer_store = get_peer_store(PEERS_DIR)
+
+@st.cache_resource(show_spinner=False)
+def get_cohort_store(directory):
+    """Returns the process-wide store of class clusters."""
+    return CohortStore(directory)
+
+cohort_store = get_cohort_store(COHORTS_DIR)
+
+@st.cache_resource(show_spinner=False)
+def get_scoring_client(url):
+    """Returns the process-wide scoring service client, whose keep-alive connections all sessions share."""
+    return ScoringClient(url) if url else None
+
+scoring_client = get_scoring_client(SCORING_SERVICE_URL)
+
+@st.cache_resource(show_spinner=False)
+def get_report_queue(directory):
+    """Returns the process-wide background report renderer and its on-disk cache."""
+    return ReportQueue(directory)
+
+report_queue = get_report_queue(REPORTS_DIR)
+
+def cache_counters(figure_cache):
+    """Returns the hit and miss counts of the process-wide caches, by cache name."""
+    model_stats = MODEL_CACHE.stats()
+    figure_stats = figure_cache.stats()
+    return {
+        "figure": {"hits": figure_stats["hits"], "misses": figure_stats["misses"]},
+        "model": {"hits": model_stats["hits"], "misses": model_stats["loads"]},
+    }
+
+@st.cache_resource(show_spinner=False)
+def get_metrics_exporter(_figure_cache):
+    """Starts the process-wide metrics exporter if an export destination is configured."""
+    if not (METRICS_FILE or METRICS_LOG):
+        return None
+    return MetricsExporter(
+        lambda: (PROFILER.snapshot(), cache_counters(_figure_cache)),
+        prometheus_path=METRICS_FILE, jsonl_path=METRICS_LOG, interval=METRICS_INTERVAL,
+    )
+
+get_metrics_exporter(figure_cache)
 
 
 # --- 2. Session state management ---
-# Initialize session state variables on first run
-if "page" not in st.session_state:
+# Each session keeps the compiled QuizModel it started with, so a bank edited mid-quiz
+# only affects new sessions. The rest of the state is compact: the question order is
+# a permutation of indices into the model's questions, and the answers are one int8
+# per question in bank order (1-5, or 0 when unanswered), so a session holds a couple
+# of hundred bytes of quiz data.
+# The session's ScoreAccumulator is updated on every answer change, so scores are
+# always current and the results page never rescans the question bank.
+# Every session is also persisted under a random token, kept in the `session` query
+# parameter, so reopening the same URL resumes the quiz after a restart.
+def requested_bank():
+    """Returns the quiz name from the URL ("" for the default quiz) and its bank file."""
+    quiz_name = st.query_params.get("quiz", "")
+    return quiz_name, bank_path(quiz_name) if quiz_name else DEFAULT_QUESTION_BANK_PATH
+
+@st.cache_resource(show_spinner=False, max_entries=MODEL_CACHE.max_models)
+def get_adaptive_selector(bank_fingerprint, _model):
+    """Returns the adaptive question selector for a bank, shared by every session."""
+    return AdaptiveSelector(_model, confidence=ADAPTIVE_CONFIDENCE)
+
+def choose_adaptive_question(position):
+    """
+    Moves the most informative of the questions not yet reached into `position` of
+    the session's question order. Returns True if the order changed.
+    """
+    order = st.session_state.question_order
+    model = st.session_state.model
+    with PROFILER.stage("adaptive_select"):
+        chosen = get_adaptive_selector(model.fingerprint, model).next_question(
+            st.session_state.answers, candidates=order[position:]
+        )
+    if chosen is None or order[position] == chosen:
+        return False
+    swap = position + int(np.flatnonzero(order[position:] == chosen)[0])
+    order[position], order[swap] = order[swap], order[position]
+    return True
+
+def reset_quiz_state(bank_file):
+    """Starts a new quiz from a bank file with a fresh random question order and no answers."""
+    model = load_model(bank_file)
+    st.session_state.bank_file = bank_file
+    st.session_state.model = model
     st.session_state.page = "quiz"
-    st.session_state.responses = {}
-    st.session_state.randomized_questions = QUESTIONS_DATA.copy()
-    random.shuffle(st.session_state.randomized_questions)
+    st.session_state.question_order = np.random.permutation(len(model.questions)).astype(np.uint16)
+    st.session_state.answers = np.zeros(len(model.questions), dtype=np.int8)
+    st.session_state.accumulator = ScoreAccumulator(model)
     st.session_state.current_question_index = 0
+    if ADAPTIVE_QUESTIONS:
+        choose_adaptive_question(0)
+    st.session_state.session_token = secrets.token_urlsafe(12)
+    st.query_params["session"] = st.session_state.session_token
+    response_store.create_session(
+        st.session_state.session_token, st.session_state.question_order, model.fingerprint
+    )
+
+def resume_quiz_state(token, bank_file):
+    """Restores a stored session; returns False if it is unknown or from another question bank."""
+    model = load_model(bank_file)
+    stored = response_store.load_session(token)
+    if stored is None or stored["bank_fingerprint"] != model.fingerprint:
+        return False
+    st.session_state.bank_file = bank_file
+    st.session_state.model = model
+    st.session_state.page = "results" if stored["completed"] else "quiz"
+    st.session_state.question_order = stored["question_order"]
+    st.session_state.answers = stored["answers"]
+    st.session_state.accumulator = ScoreAccumulator.from_answers(model, stored["answers"])
+    st.session_state.current_question_index = stored["current_question"]
+    st.session_state.session_token = token
+    return True
+
+def record_answer(question_index, value):
+    """Stores an answer (1-5, or 0 to clear it) and applies it to the running scores."""
+    answers = st.session_state.answers
+    if answers[question_index] == value:
+        return
+    with PROFILER.stage("score"):
+        st.session_state.accumulator.update(question_index, answers[question_index], value)
+    answers[question_index] = value
+    response_store.record_answer(st.session_state.session_token, question_index, value)
+
+def complete_quiz(record=True):
+    """
+    Marks the session as submitted and switches to the results page. Only real
+    submissions (`record`) are added to the norms, item statistics, peers and class
+    clusters; debug completions with random answers would skew them.
+    """
+    model = st.session_state.model
+    normalized = st.session_state.accumulator.normalized()
+    if record:
+        norms_store.record(model.fingerprint, model.dimensions, normalized)
+        item_stats_store.record(model.fingerprint, st.session_state.answers)
+        peer_store.record(model.fingerprint, model.dimensions, normalized, owner_id(st.session_state.session_token))
+        cohort_store.record(model.fingerprint, model.dimensions, st.query_params.get("class", ""), normalized)
+    st.session_state.page = "results"
+    response_store.set_progress(
+        st.session_state.session_token, st.session_state.current_question_index, completed=True, debug=not record
+    )
+
+# Teachers open the class dashboard with ?view=dashboard (and &class=<class>); it only
+# reads the cached cluster aggregates and starts no quiz session
+SHOW_DASHBOARD = st.query_params.get("view") == "dashboard"
+
+# Initialize session state variables on first run, and again if the URL switches quiz
+try:
+    quiz_name, quiz_bank_file = requested_bank()
+    if not SHOW_DASHBOARD and ("page" not in st.session_state or st.session_state.quiz_name != quiz_name):
+        # New visitors have no session link, so there is nothing to look up
+        resume_token = st.query_params.get("session", "")
+        if not (resume_token and resume_quiz_state(resume_token, quiz_bank_file)):
+            reset_quiz_state(quiz_bank_file)
+        st.session_state.quiz_name = quiz_name
+except BankError as exc:
+    st.error(f"This quiz is not available: {exc}")
+    st.stop()
 
 def show_debug_button():
     """Displays a debug button in the sidebar to randomly complete the quiz."""
     st.sidebar.markdown("---")
     st.sidebar.header("Debug Tools")
     if st.sidebar.button("Debug: Randomly Complete Quiz"):
-        # Reset responses and fill with random choices
-        st.session_state.responses = {}
-        options = ["1 - 😞", "2 - 😐", "3 - 👍", "4 - 😄", "5 - 😎"]
-        for q_data in st.session_state.randomized_questions:
-            st.session_state.responses[q_data["question"]] = random.choice(options)
-        
-        # Transition to the results page
-        st.session_state.page = "results"
+        # Overwrite every answer with a random choice
+        model = st.session_state.model
+        st.session_state.answers[:] = np.random.randint(1, MAX_ANSWER + 1, size=len(model.questions))
+        with PROFILER.stage("score"):
+            st.session_state.accumulator = ScoreAccumulator.from_answers(model, st.session_state.answers)
+        response_store.record_answers(st.session_state.session_token, st.session_state.answers)
+
+        # Transition to the results page, leaving the random answers out of the norms,
+        # item statistics, peers and class clusters
+        complete_quiz(record=False)
         st.rerun()
 
+def show_live_profile():
+    """Shows the top dimensions so far, straight from the running scores."""
+    dimensions = st.session_state.model.dimensions
+    normalized = st.session_state.accumulator.normalized()
+    with st.expander("Your profile so far"):
+        if np.isnan(normalized).all():
+            st.markdown("Answer a question to start building your profile.")
+            return
+        for dim_index in top_dimensions(normalized, k=3):
+            if not np.isnan(normalized[dim_index]):
+                st.markdown(f"- {dimensions[dim_index]}: {normalized[dim_index]:.2f}")
+
+def show_figure_cache_stats():
+    """Shows the result figure cache's hit and miss counts in the sidebar."""
+    stats = figure_cache.stats()
+    with st.sidebar.expander("Figure cache"):
+        st.markdown(
+            f"- Hits: {stats['hits']} / misses: {stats['misses']} ({stats['hit_rate']:.0%})\n"
+            f"- Entries: {stats['entries']} ({stats['size_bytes'] / 1024:.0f} KiB), evictions: {stats['evictions']}"
+        )
+
+def show_model_cache_stats():
+    """Shows which compiled quiz models are resident in this process and their load times."""
+    stats = MODEL_CACHE.stats()
+    with st.sidebar.expander("Quiz models"):
+        st.markdown(
+            f"- Hits: {stats['hits']} / loads: {stats['loads']} ({stats['load_seconds'] * 1000:.0f} ms), "
+            f"evictions: {stats['evictions']}\n"
+            f"- Resident: {len(stats['models'])} ({stats['size_bytes'] / 1024:.0f} KiB)"
+        )
+        for entry in stats["models"]:
+            st.markdown(
+                f"- `{os.path.basename(entry['path'])}`: {entry['questions']} questions, "
+                f"{entry['nbytes'] / 1024:.0f} KiB, loaded in {entry['load_seconds'] * 1000:.1f} ms"
+            )
+
+def show_profiler():
+    """Shows live per-stage timings and cache hit rates in the sidebar."""
+    with st.sidebar.expander("Profiler"):
+        if not PROFILER.enabled:
+            st.markdown("Profiling is off (JAGGED_QUIZ_PROFILE=0).")
+            return
+        rows = [
+            f"| {name} | {stats['count']} | {stats['mean_s'] * 1000:.1f} | {stats['p95_s'] * 1000:.1f} | {stats['max_s'] * 1000:.1f} |"
+            for name, stats in PROFILER.snapshot().items()
+        ]
+        st.markdown("\n".join(["| Stage | Calls | Mean ms | p95 ms | Max ms |", "|---|--:|--:|--:|--:|"] + rows))
+        for cache, counts in cache_counters(figure_cache).items():
+            lookups = counts["hits"] + counts["misses"]
+            st.markdown(f"- {cache.capitalize()} cache hit rate: {counts['hits'] / lookups if lookups else 0:.0%} of {lookups}")
+
+def show_import_status():
+    """Shows in the sidebar which deferred libraries are loaded and what they cost."""
+    with st.sidebar.expander("Deferred imports"):
+        for module_name in LAZY_MODULES:
+            st.markdown(f"- `{module_name}`: {import_status(module_name)}")
+
 # --- 3. Quiz page function ---
+# Answering a question and Back/Next rerun only the question area (an st.fragment),
+# so the title, sidebar and debug tools are not re-rendered for every click; only
+# Submit Quiz reruns the whole script. Set to False to rerun the script on every click.
+FRAGMENT_NAVIGATION = True
+
+@PROFILER.timed()
 def show_quiz():
     """Displays the quiz questions and a submit button."""
     # Custom CSS for a more dynamic and colorful title
@@ -455,25 +382,53 @@ def show_quiz():
     """, unsafe_allow_html=True)
     st.write("---")
 
+    question_area = st.fragment(show_question) if FRAGMENT_NAVIGATION else show_question
+    question_area()
+
+def move_question(step):
+    """
+    Button callback that moves to the previous or next question. Callbacks run
+    before the rerun the click triggers, so with FRAGMENT_NAVIGATION the fragment
+    rerun already shows the new question without an explicit st.rerun().
+    """
+    st.session_state.current_question_index += step
+    position = st.session_state.current_question_index
+    # Moving on to a question not seen yet: pick it now, from the latest answers
+    if ADAPTIVE_QUESTIONS and step > 0 and not st.session_state.answers[st.session_state.question_order[position]]:
+        if choose_adaptive_question(position):
+            response_store.set_question_order(st.session_state.session_token, st.session_state.question_order)
+    response_store.set_progress(st.session_state.session_token, st.session_state.current_question_index)
+
+@PROFILER.timed()
+def show_question():
+    """
+    Displays the current question with its progress bar and Back/Next buttons.
+    With FRAGMENT_NAVIGATION this runs as an st.fragment, so answering and moving
+    between questions reruns only this function instead of the whole script.
+    """
     # Get the current question
     current_question_index = st.session_state.current_question_index
-    total_questions = len(st.session_state.randomized_questions)
-    q_data = st.session_state.randomized_questions[current_question_index]
+    total_questions = len(st.session_state.question_order)
+    question_index = int(st.session_state.question_order[current_question_index])
+    q_data = st.session_state.model.questions[question_index]
+    answers = st.session_state.answers
 
     # Display progress
     progress_percentage = (current_question_index + 1) / total_questions
     st.progress(progress_percentage)
     st.markdown(f"**Question {current_question_index + 1} of {total_questions}**")
 
-    # Display the single question
+    # Display the single question, preselecting the stored answer when going back
     question_text = q_data["question"]
-    st.session_state.responses[question_text] = st.radio(
+    answer = st.radio(
         question_text,
-        options=["1 - 😞", "2 - 😐", "3 - 👍", "4 - 😄", "5 - 😎"],
-        index=None,
-        key=f"q_{current_question_index}",
+        options=ANSWER_OPTIONS,
+        index=int(answers[question_index]) - 1 if answers[question_index] else None,
+        key=f"q_{question_index}",
         horizontal=True
     )
+    if answer is not None:
+        record_answer(question_index, ANSWER_VALUES[answer])
     st.markdown("---")
 
     col1, col2, col3 = st.columns([1, 1, 1])
@@ -481,123 +436,154 @@ def show_quiz():
     # Back button
     with col1:
         if st.session_state.current_question_index > 0:
-            if st.button("Back"):
-                st.session_state.current_question_index -= 1
-                st.rerun()
+            st.button("Back", on_click=move_question, args=(-1,))
 
     # Next / Submit button
     with col3:
         # Check if an answer has been selected for the current question
-        has_answered = st.session_state.responses.get(question_text) is not None
-
-        if st.session_state.current_question_index < total_questions - 1:
-            if st.button("Next", type="primary", disabled=not has_answered):
-                st.session_state.current_question_index += 1
-                st.rerun()
-        else: # Last question
+        has_answered = answers[question_index] > 0
+        profile_is_stable = ADAPTIVE_QUESTIONS and has_answered and get_adaptive_selector(
+            st.session_state.model.fingerprint, st.session_state.model
+        ).is_stable(answers)
+
+        if st.session_state.current_question_index < total_questions - 1 and not profile_is_stable:
+            st.button("Next", type="primary", disabled=not has_answered, on_click=move_question, args=(1,))
+        else: # Last question, or the adaptive quiz has enough answers
+            if profile_is_stable and st.session_state.current_question_index < total_questions - 1:
+                st.caption("Your top strengths are clear, so you can finish here.")
             if st.button("Submit Quiz", type="primary", disabled=not has_answered):
-                st.session_state.page = "results"
+                complete_quiz()
                 st.rerun()
 
-def create_network_chart(scores_normalized, connections):
+    show_live_profile()
+
+@st.cache_resource(show_spinner=False, max_entries=MODEL_CACHE.max_models)
+def get_dimension_layout(bank_fingerprint, _dimensions, _connections):
     """
-    Creates an interactive network diagram of all dimensions using a force-directed layout
-    similar to Obsidian's graph view.
+    Returns the bank's dimension graph layout (see charts.compute_dimension_layout).
+    The layout only depends on the bank, never on a user's answers, so it is cached
+    process-wide and shared by every session; `bank_fingerprint` is the cache key.
     """
-    if not scores_normalized:
-        return go.Figure()
-
-    # Create a NetworkX graph
-    G = nx.Graph()
-    G.add_nodes_from(DIMENSIONS)
-    for (dim1, dim2), weight in connections.items():
-        if weight > 0:
-            G.add_edge(dim1, dim2, weight=weight)
-    
-    # Use NetworkX's spring layout for a force-directed effect
-    pos = nx.spring_layout(G, k=0.5, iterations=50, seed=42) # k: optimal distance between nodes, iterations: number of iterations
-
-    # Create traces for each individual edge to allow for per-line styling
-    edge_traces = []
-    for edge in G.edges(data=True):
-        x0, y0 = pos[edge[0]]
-        x1, y1 = pos[edge[1]]
-        weight = connections.get(tuple(sorted((edge[0], edge[1]))), 0)
-        
-        # We need a small weight to avoid a zero-width line
-        line_width = max(0.5, weight * 3) 
-        
-        # Use a color scale to give the lines a dynamic, flowing look
-        # Normalizing the weight for the color scale (assuming max weight is 5)
-        normalized_weight_for_color = weight / 5.0
-        
-        edge_trace = go.Scatter(
-            x=[x0, x1, None], 
-            y=[y0, y1, None],
-            line=dict(
-                width=line_width,
-                color=f'rgba(68, 1, 84, {normalized_weight_for_color})', # Use a single color with a dynamic alpha for a flow effect
-            ),
-            hoverinfo='text',
-            text=f"Connection: {edge[0]} - {edge[1]}<br>Weight: {weight:.2f}",
-            mode='lines',
-            opacity=0.8
-        )
-        edge_traces.append(edge_trace)
-
-    # Create nodes for the network
-    node_x = [pos[dim][0] for dim in DIMENSIONS]
-    node_y = [pos[dim][1] for dim in DIMENSIONS]
-    node_scores = [scores_normalized.get(dim, 1) for dim in DIMENSIONS]
-    node_text = [
-        f"{dim}<br>Score: {scores_normalized.get(dim, 1):.2f}" for dim in DIMENSIONS
-    ]
-
-    # Scale node size for better visualization
-    node_sizes = [score * 10 for score in node_scores]
-
-    node_trace = go.Scatter(
-        x=node_x, y=node_y,
-        mode='markers+text',
-        hovertemplate=node_text,
-        text=DIMENSIONS,
-        textposition="bottom center",
-        marker=dict(
-            colorscale='Viridis',
-            reversescale=True,
-            color=node_scores,
-            size=node_sizes,
-            colorbar=dict(
-                thickness=15,
-                title=dict(text='Score', side='right'),
-                tickvals=[1, 2, 3, 4, 5],
-                ticktext=['1', '2', '3', '4', '5'],
-            ),
-            line_width=2
-        ),
-        textfont=dict(size=10)
-    )
-    
-    # Combine all traces for the final figure
-    fig_data = edge_traces + [node_trace]
-    fig = go.Figure(data=fig_data,
-                    layout=go.Layout(
-                        title=dict(text='Network of Your Learning Dimensions', font=dict(size=20)),
-                        showlegend=False,
-                        hovermode='closest',
-                        margin=dict(b=20,l=5,r=5,t=40),
-                        xaxis=dict(showgrid=False, zeroline=False, showticklabels=False, range=[-1.2, 1.2]),
-                        yaxis=dict(showgrid=False, zeroline=False, showticklabels=False, range=[-1.2, 1.2]),
-                        height=600
-                    )
-                   )
-
-    return fig
+    with PROFILER.stage("layout"):
+        return compute_dimension_layout(_dimensions, _connections)
 
 
 # --- 4. Results page function ---
+def service_scores(model):
+    """
+    Returns the session's normalized scores from the scoring service, or None if
+    not in client mode, the service fails or it scored a different bank version.
+    """
+    if scoring_client is None:
+        return None
+    try:
+        with PROFILER.stage("score_service"):
+            result = scoring_client.score(st.session_state.answers, bank=st.session_state.quiz_name or None)
+    except ScoringServiceError:
+        logger.exception("Scoring locally instead")
+        return None
+    if result["fingerprint"] != model.fingerprint:
+        return None
+    return np.array([np.nan if score is None else score for score in result["scores"]])
+
+def career_matches(model, normalized, k=5):
+    """
+    Returns the k best whole-profile career matches, from the scoring service in
+    client mode unless it fails or matched against a different version of the bank
+    or its careers.
+    """
+    if scoring_client is not None:
+        try:
+            with PROFILER.stage("recommend_service"):
+                result = scoring_client.recommend(normalized, k=k, bank=st.session_state.quiz_name or None)
+        except ScoringServiceError:
+            logger.exception("Recommending locally instead")
+        else:
+            if result["content_fingerprint"] == model.content_fingerprint:
+                return [(career["name"], career["similarity"]) for career in result["careers"]]
+    with PROFILER.stage("recommend"):
+        return model.careers.top_careers(normalized, k=k)
+
+# "Students like you" are the PEER_COUNT most similar stored profiles; the careers
+# listed are their own top whole-profile career matches
+PEER_COUNT = 20
+PEER_CAREERS = 3
+
+def show_peers(model, normalized):
+    """Shows the careers explored by the students whose profiles are most like this one."""
+    with PROFILER.stage("peers"):
+        similarities, peer_scores = peer_store.nearest(
+            model.fingerprint, model.dimensions, normalized, k=PEER_COUNT,
+            exclude_owner=owner_id(st.session_state.session_token),
+        )
+    # Profiles shaped unlike this one are not "like you", however few there are
+    alike = similarities > 0
+    similarities, peer_scores = similarities[alike], peer_scores[alike]
+    if len(similarities) == 0:
+        st.write("Once more students have completed this quiz, you'll see the careers explored by students like you.")
+        return
+    if len(model.careers):
+        indices, _ = model.careers.recommend(peer_scores, k=PEER_CAREERS)
+        counts = collections.Counter(model.careers.names[i] for row in indices for i in row)
+        st.write(f"Among the {len(similarities)} students whose profiles are most like yours, these careers came up most:")
+        for career, count in counts.most_common(5):
+            st.markdown(f"- **{career}** ({count} of {len(similarities)} students)")
+
+    with st.expander("👥 Profiles most like yours"):
+        top = top_dimensions(peer_scores[:5], k=3)
+        for similarity, scores, dims in zip(similarities, peer_scores, top):
+            strengths = ", ".join(model.dimensions[i] for i in dims if not np.isnan(scores[i]))
+            st.markdown(f"- {max(similarity, 0):.0%} similar: strongest in {strengths}")
+
+# Reports render in the background; while one is pending, the report area is a
+# fragment that polls every REPORT_POLL_SECONDS, and a full rerun stops the polling.
+REPORT_POLL_SECONDS = 1.0
+
+def report_status(payload):
+    """Returns (format, key, status) of the report for the selected format."""
+    fmt = st.session_state.get("report_format", "pdf")
+    key = report_key(payload, fmt)
+    return fmt, key, report_queue.status(key, fmt)
+
+def show_report_download(payload):
+    """Shows the report download area, polling for the report while it renders."""
+    polling = report_status(payload)[2] == "pending"
+    st.fragment(show_report_area, run_every=REPORT_POLL_SECONDS if polling else None)(payload, polling)
+
+def show_report_area(payload, polling):
+    """Offers the report for download once rendered, and a button to request it."""
+    st.radio("Report format", list(REPORT_FORMATS), format_func=str.upper, horizontal=True, key="report_format")
+    fmt, key, status = report_status(payload)
+    if (status == "pending") != polling:
+        st.rerun()
+    if status == "ready":
+        st.download_button(
+            "Download your report", data=report_queue.read(key, fmt),
+            file_name=f"learning-profile.{fmt}", mime=REPORT_FORMATS[fmt], type="primary",
+        )
+    elif status == "pending":
+        st.info("Preparing your report...")
+    else:
+        if status == "failed":
+            st.error("Your report could not be created. Please try again.")
+        if st.button("Prepare my report"):
+            _, status = report_queue.submit(payload, fmt)
+            if status == "busy":
+                st.warning("Many reports are being prepared right now. Please try again in a moment.")
+            else:
+                st.rerun()
+
+def ordinal(number):
+    """Formats a whole number as an English ordinal, e.g. 1st, 12th, 23rd."""
+    suffix = "th" if 10 <= number % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(number % 10, "th")
+    return f"{number}{suffix}"
+
+
+@PROFILER.timed()
 def show_results():
     """Calculates scores and displays the results page with charts and table."""
+    pd = lazy_import("pandas")
+
     st.markdown("""
         <div style="text-align: center; padding: 20px; background-color: #F0F2F6; border-radius: 10px; margin-bottom: 30px;">
             <h1 style="color: #4CAF50; font-size: 3em; font-weight: bold;">Your Jagged Learning Profile 🚀</h1>
@@ -605,82 +591,67 @@ def show_results():
     """, unsafe_allow_html=True)
     st.write("---")
 
-    # Initialize scores and maximum possible scores for all dimensions to zero
-    scores = {dim: 0 for dim in DIMENSIONS}
-    max_scores = {dim: 0 for dim in DIMENSIONS}
-    
-    # Calculate connections for the Venn chart
-    connections = {}
-    for q_data in QUESTIONS_DATA:
-        primary_dim = q_data["primary_dimension"]
-        for secondary_dim, weight in q_data["secondary_weights"].items():
-            if primary_dim != secondary_dim:
-                key = tuple(sorted((primary_dim, secondary_dim)))
-                connections.setdefault(key, 0)
-                connections[key] += weight
-
-
-    # Calculate scores based on the responses to the randomized questions
-    for q_data in st.session_state.randomized_questions:
-        question_text = q_data["question"]
-        primary_dim = q_data["primary_dimension"]
-        secondary_weights = q_data["secondary_weights"]
-
-        # Extract integer value from emoji-enhanced radio button selection
-        # Ensure a response exists before trying to access it
-        response_str = st.session_state.responses.get(question_text)
-        if response_str:
-            response = int(response_str.split(' ')[0])
-
-            # Apply scoring for primary dimension
-            scores[primary_dim] += response
-            max_scores[primary_dim] += 5
-
-            # Apply scoring for secondary dimensions
-            for sec_dim, weight in secondary_weights.items():
-                scores[sec_dim] += response * weight
-                max_scores[sec_dim] += 5 * weight
-
-    # Normalize scores by dividing the raw score by the maximum possible score for that dimension,
-    # then scaling the result to be between 1 and 5. This prevents scores from exceeding 5.
+    # The session's running totals are already up to date with every answer; in client
+    # mode the scoring service scores the answers instead
+    model = st.session_state.model
+    normalized = service_scores(model)
+    if normalized is None:
+        with PROFILER.stage("score"):
+            normalized = st.session_state.accumulator.normalized()
+
+    # Normalized scores are the raw score divided by the maximum possible score for
+    # that dimension, scaled to 0-5. Dimensions without any answers are left out.
     scores_normalized = {
-        dim: (scores[dim] / max_scores[dim]) * 5
-        for dim in DIMENSIONS if max_scores[dim] > 0
+        dim: float(normalized[i])
+        for i, dim in enumerate(model.dimensions) if not np.isnan(normalized[i])
     }
 
+    # Figures are served from the process-wide cache when this profile, rounded to the
+    # displayed precision, has been rendered before; only misses run Plotly/NetworkX.
+    cache_key = profile_cache_key(model.fingerprint, normalized)
+
     # --- Plotly Network Chart (New Chart) ---
     st.subheader("Network of Your Learning Dimensions")
     st.markdown("This chart shows how all your learning dimensions are connected. The **size** of each circle represents your score in that dimension, and the **lines** show the connections between them.")
-    fig_network = create_network_chart(scores_normalized, connections)
-    st.plotly_chart(fig_network, use_container_width=True)
-    
+    def build_network_chart():
+        layout = get_dimension_layout(model.fingerprint, model.dimensions, model.connections)
+        with PROFILER.stage("figure_build"):
+            return create_network_chart(model, scores_normalized, layout=layout).to_json()
+
+    network_json = figure_cache.get_or_build(("network",) + cache_key, build_network_chart)
+    with PROFILER.stage("plotly_chart"):
+        st.plotly_chart(json.loads(network_json), use_container_width=True)
+
     st.markdown("---")
 
     # --- Plotly Radar Chart ---
     st.subheader("Your Learning Profile Overview")
-    fig_radar = go.Figure()
-    fig_radar.add_trace(go.Scatterpolar(
-        r=list(scores_normalized.values()),
-        theta=list(scores_normalized.keys()),
-        fill='toself',
-        name='Learning Profile'
-    ))
-    fig_radar.update_layout(
-        polar=dict(radialaxis=dict(visible=True, range=[1, 5])),
-        showlegend=False,
-        title_text="", # Removed title here to avoid duplication
-        title_x=0.5 # Center the title
-    )
-    st.plotly_chart(fig_radar, use_container_width=True)
+    def build_radar_chart():
+        with PROFILER.stage("figure_build"):
+            return create_radar_chart(scores_normalized).to_json()
+
+    radar_json = figure_cache.get_or_build(("radar",) + cache_key, build_radar_chart)
+    with PROFILER.stage("plotly_chart"):
+        st.plotly_chart(json.loads(radar_json), use_container_width=True)
 
     # --- Results Table ---
     st.subheader("Your Scores per Dimension")
-    score_df = pd.DataFrame(
-        list(scores_normalized.items()), columns=["Dimension", "Score"]
-    )
+    percentiles = norms_store.percentiles(model.fingerprint, model.dimensions, normalized)
+    score_df = pd.DataFrame({
+        "Dimension": list(scores_normalized),
+        "Score": list(scores_normalized.values()),
+        "Percentile": [percentiles[model.dimension_index[dim]] for dim in scores_normalized],
+    })
     score_df = score_df.sort_values("Score", ascending=False)
     # Display the table with a clean index and formatted score, with a height to show all rows
-    st.dataframe(score_df.style.format({"Score": "{:.2f}"}), use_container_width=True, height=len(score_df) * 35 + 38)
+    st.dataframe(
+        score_df.style.format({"Score": "{:.2f}", "Percentile": "{:.0f}"}, na_rep="–"),
+        use_container_width=True, height=len(score_df) * 35 + 38,
+    )
+    st.caption(
+        f"Percentiles compare your scores with the "
+        f"{norms_store.total(model.fingerprint, model.dimensions)} completed profiles for this quiz."
+    )
 
     # --- Top Strengths Summary ---
     st.subheader("Top Strengths & Career Paths 🚀")
@@ -691,35 +662,98 @@ def show_results():
     for _, row in top_dims.iterrows():
         dimension = row['Dimension']
         score = row['Score']
-        st.markdown(f"#### **{dimension}** (Score: {score:.2f})")
+        percentile = row['Percentile']
+        standing = "" if np.isnan(percentile) else f", {ordinal(round(percentile))} percentile"
+        st.markdown(f"#### **{dimension}** (Score: {score:.2f}{standing})")
 
         # Use an expander to make the content collapsible
         with st.expander("💡 Learning Paths & Subjects"):
             st.markdown("Here are some subjects and fields you can explore:")
-            paths = LEARNING_PATHS_AND_CAREERS.get(dimension, {}).get("learning", [])
+            paths = model.learning_paths_and_careers.get(dimension, {}).get("learning", [])
             for path in paths:
                 st.markdown(f"- {path}")
 
         with st.expander("💼 Potential Career Paths"):
             st.markdown("Your strengths in this area could lead to a career as a:")
-            careers = LEARNING_PATHS_AND_CAREERS.get(dimension, {}).get("careers", [])
+            careers = model.learning_paths_and_careers.get(dimension, {}).get("careers", [])
             for career in careers:
                 st.markdown(f"- {career}")
 
+    # --- Whole-profile career matches ---
+    st.subheader("Careers That Match Your Whole Profile")
+    st.write("These careers fit the overall shape of your strengths, not just your top three:")
+    for career, similarity in career_matches(model, normalized):
+        st.markdown(f"- **{career}** ({max(similarity, 0):.0%} match)")
+
+    # --- Students like you ---
+    st.subheader("Students Like You")
+    show_peers(model, normalized)
+
+    # --- Downloadable report ---
+    st.subheader("Download Your Profile Report 📄")
+    show_report_download(report_payload(model, normalized))
+
     st.markdown("---")
     if st.button("Restart Quiz"):
-        st.session_state.page = "quiz"
-        st.session_state.responses = {}
         # Re-randomize questions for the new quiz
-        st.session_state.randomized_questions = QUESTIONS_DATA.copy()
-        random.shuffle(st.session_state.randomized_questions)
-        st.session_state.current_question_index = 0
+        reset_quiz_state(st.session_state.bank_file)
         st.rerun()
 
 
-# --- 5. Page navigation logic ---
-show_debug_button()
-if st.session_state.page == "quiz":
-    show_quiz()
+# --- 5. Class dashboard ---
+@PROFILER.timed()
+def show_dashboard():
+    """Displays the learner archetypes of a class, rendered from its cluster aggregates."""
+    pd = lazy_import("pandas")
+    model = load_model(quiz_bank_file)
+
+    st.title("Class Dashboard 📊")
+    st.write(f"Learner archetypes for **{model.title or 'the Jagged Learning Profile Quiz'}**")
+    options = [SCHOOL] + cohort_store.classes(model.fingerprint)
+    requested = st.query_params.get("class", "")
+    class_name = st.selectbox(
+        "Class", options, index=options.index(requested) if requested in options else 0,
+        format_func=lambda name: "Whole school" if name == SCHOOL else name,
+    )
+    clusters = cohort_store.clusters(model.fingerprint, model.dimensions, class_name)
+    if clusters.size == 0:
+        st.info("No students have completed the quiz here yet.")
+        return
+
+    archetypes = clusters.archetypes()
+    students, groups = st.columns(2)
+    students.metric("Students", clusters.size)
+    groups.metric("Archetypes", len(archetypes))
+
+    # Archetypes are named after the dimensions where they stand out from the class
+    st.subheader("Archetypes")
+    for i, archetype in enumerate(archetypes, 1):
+        st.markdown(f"#### Archetype {i}: strongest in {' and '.join(archetype['strengths'])}")
+        st.progress(archetype["share"], text=f"{archetype['count']} students ({archetype['share']:.0%})")
+
+    st.subheader("Average Scores per Archetype")
+    st.plotly_chart(create_archetype_heatmap(model.dimensions, archetypes), use_container_width=True)
+    archetype_df = pd.DataFrame(
+        [archetype["centroid"] for archetype in archetypes],
+        columns=list(model.dimensions),
+        index=[f"Archetype {i}" for i in range(1, len(archetypes) + 1)],
+    )
+    archetype_df["Spread"] = [archetype["spread"] for archetype in archetypes]
+    st.dataframe(archetype_df.style.format("{:.2f}"), use_container_width=True)
+    st.caption("Spread is the typical distance of an archetype's students from its average profile.")
+
+
+# --- 6. Page navigation logic ---
+if SHOW_DASHBOARD:
+    show_dashboard()
 else:
-    show_results()
+    show_debug_button()
+    if st.session_state.page == "quiz":
+        show_quiz()
+    else:
+        show_results()
+rerun_timer.stop()
+show_profiler()
+show_figure_cache_stats()
+show_model_cache_stats()
+show_import_status()
@@ -0,0 +1,37 @@
+# lazy_imports.py
+
+"""
+Deferred imports for heavy libraries that only the results page needs.
+
+pandas, plotly and networkx are imported on first use instead of at startup, so
+taking the quiz never loads them. This lives outside the Streamlit script, which
+is re-executed on every rerun, so IMPORT_TIMINGS survives for the whole process.
+"""
+
+import importlib
+import sys
+import time
+
+LAZY_MODULES = ["pandas", "plotly.graph_objects", "networkx"]
+
+# Seconds each deferred import took in this process, by module name
+IMPORT_TIMINGS = {}
+
+
+def lazy_import(module_name):
+    """Imports a module on first use, recording its import time in IMPORT_TIMINGS."""
+    module = sys.modules.get(module_name)
+    if module is None:
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        IMPORT_TIMINGS[module_name] = time.perf_counter() - start
+    return module
+
+
+def import_status(module_name):
+    """Describes whether a deferred module is loaded and what its import cost."""
+    if module_name in IMPORT_TIMINGS:
+        return f"{IMPORT_TIMINGS[module_name] * 1000:.0f} ms"
+    if module_name in sys.modules:
+        return "loaded by another module"
+    return "not loaded"
@@ -0,0 +1,229 @@
+# load_test.py
+
+"""
+Concurrent-session load test for the quiz app, driven headlessly through
+Streamlit's AppTest, so it runs offline without a browser or server.
+
+Usage:
+    python load_test.py [--sessions N] [--concurrency N] [--answer N] [--back-rate P] [--json FILE]
+
+Each simulated session opens the quiz, answers `--answer` questions with
+Next (stepping Back and forward again at rate `--back-rate`), fills in the
+rest with the "Debug: Randomly Complete Quiz" button and renders the results
+page twice. AppTest is not thread-safe, so sessions run one at a time in each
+of `--concurrency` worker processes. Each worker stands in for a Streamlit
+server process with its own caches, and all of them share one response store
+and the norms, peers, cohorts and reports directories, kept in a temporary
+directory. The report gives p50/p95/p99 latency per rerun and per action,
+rerun and session throughput, and the resident memory added per live session.
+"""
+
+import argparse
+import atexit
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jagged_quiz.py")
+
+
+def current_rss_bytes():
+    """Returns this process's resident set size, from /proc on Linux."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        # Peak rather than current RSS, in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def share_script_cache():
+    """
+    Makes every AppTest run reuse one compiled copy of the app, as a Streamlit
+    server does. AppTest otherwise recompiles the script on each run,
+    wasted work that a server does not do.
+    """
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    shared = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: shared
+
+
+class SessionDriver:
+    """Drives one simulated user through the app, timing every rerun."""
+
+    def __init__(self, rng, timings, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.rng = rng
+        self.timings = timings
+
+    def _timed(self, action, element=None):
+        start = time.perf_counter()
+        (element or self.app).run()
+        self.timings[action].append(time.perf_counter() - start)
+        if self.app.exception:
+            raise RuntimeError(f"App raised during {action}: {self.app.exception[0].message}")
+
+    def _button(self, label, sidebar=False):
+        buttons = self.app.sidebar.button if sidebar else self.app.button
+        for button in buttons:
+            if button.label == label:
+                return button
+        return None
+
+    def run(self, answer_count, back_rate):
+        self._timed("open")
+        for _ in range(answer_count):
+            radio = self.app.radio[0]
+            if radio.value is None:
+                self._timed("answer", radio.set_value(self.rng.choice(radio.options)))
+            next_button = self._button("Next")
+            if next_button is None:
+                break
+            self._timed("next", next_button.click())
+            back_button = self._button("Back")
+            if back_button is not None and self.rng.random() < back_rate:
+                self._timed("back", back_button.click())
+                self._timed("next", self._button("Next").click())
+        self._timed("complete", self._button("Debug: Randomly Complete Quiz", sidebar=True).click())
+        self._timed("results")
+
+
+# The sessions driven by this worker process, kept alive until the end so their
+# memory is counted
+_worker_drivers = []
+
+
+def _init_worker(answer_count, back_rate, timeout):
+    """Warms up imports and process-wide caches so they are not billed to the sessions."""
+    share_script_cache()
+    SessionDriver(random.Random(-1 - os.getpid()), defaultdict(list), timeout).run(answer_count, back_rate)
+
+
+def _simulate(index, seed, answer_count, back_rate, timeout):
+    """
+    Runs one simulated session in a worker process. Returns its timings by action,
+    its wall-clock start and end, and the resident memory it added.
+    """
+    rss_before = current_rss_bytes()
+    timings = defaultdict(list)
+    started = time.time()
+    driver = SessionDriver(random.Random(seed + index), timings, timeout)
+    driver.run(answer_count, back_rate)
+    finished = time.time()
+    _worker_drivers.append(driver)
+    return dict(timings), started, finished, current_rss_bytes() - rss_before
+
+
+def run_load_test(sessions=20, concurrency=4, answer_count=10, back_rate=0.1, seed=0, timeout=60):
+    """Runs `sessions` simulated users, `concurrency` at a time, and returns the report dict."""
+    timings = defaultdict(list)
+    spans = []
+    added_rss = 0
+    with ProcessPoolExecutor(
+        max_workers=concurrency, initializer=_init_worker, initargs=(answer_count, back_rate, timeout),
+    ) as pool:
+        futures = [pool.submit(_simulate, i, seed, answer_count, back_rate, timeout) for i in range(sessions)]
+        for future in futures:
+            session_timings, started, finished, rss = future.result()
+            for action, values in session_timings.items():
+                timings[action].extend(values)
+            spans.append((started, finished))
+            added_rss += rss
+    # From the first session's start to the last one's end, leaving out worker warm-up
+    elapsed = max(end for _, end in spans) - min(start for start, _ in spans)
+    rss_per_session = added_rss / sessions
+
+    def summarize(values):
+        values = np.asarray(values) * 1000
+        return {
+            "count": int(values.size),
+            "mean_ms": float(values.mean()),
+            "p50_ms": float(np.percentile(values, 50)),
+            "p95_ms": float(np.percentile(values, 95)),
+            "p99_ms": float(np.percentile(values, 99)),
+        }
+
+    all_reruns = [value for values in timings.values() for value in values]
+    return {
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "answers_per_session": answer_count,
+        "elapsed_s": elapsed,
+        "reruns_per_s": len(all_reruns) / elapsed,
+        "sessions_per_s": sessions / elapsed,
+        "rss_per_session_bytes": rss_per_session,
+        "reruns": summarize(all_reruns),
+        "actions": {action: summarize(values) for action, values in sorted(timings.items())},
+    }
+
+
+def format_report(report):
+    """Renders the report as a plain-text table."""
+    lines = [
+        f"{report['sessions']} sessions, {report['concurrency']} concurrent, "
+        f"{report['answers_per_session']} answers each, {report['elapsed_s']:.1f} s",
+        f"Throughput: {report['reruns_per_s']:.1f} reruns/s, {report['sessions_per_s']:.2f} sessions/s",
+        f"RSS per session: {report['rss_per_session_bytes'] / 1024:.0f} KiB",
+        "",
+        f"{'action':<10} {'count':>6} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8}  (ms)",
+    ]
+    rows = [("all", report["reruns"])] + list(report["actions"].items())
+    for action, stats in rows:
+        lines.append(
+            f"{action:<10} {stats['count']:>6} {stats['mean_ms']:>8.1f} {stats['p50_ms']:>8.1f} "
+            f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the quiz app with concurrent headless sessions.")
+    parser.add_argument("--sessions", type=int, default=20, help="Simulated sessions (default: 20).")
+    parser.add_argument("--concurrency", type=int, default=4, help="Sessions running at once (default: 4).")
+    parser.add_argument("--answer", type=int, default=10, help="Questions answered before auto-completing (default: 10).")
+    parser.add_argument("--back-rate", type=float, default=0.1, help="Chance of going Back after each Next (default: 0.1).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0).")
+    parser.add_argument("--timeout", type=float, default=60, help="Per-rerun timeout in seconds (default: 60).")
+    parser.add_argument("--json", help="Also write the report as JSON to this file.")
+    args = parser.parse_args(argv)
+
+    # Keep load-test sessions out of the real response database, norms, peers, cohorts
+    # and reports, even where those are configured in the environment; the worker
+    # processes inherit it. The cleanup is registered first so it runs after the
+    # stores' own exit flushes.
+    tmp = tempfile.mkdtemp(prefix="jagged_quiz_load_test_")
+    atexit.register(shutil.rmtree, tmp, ignore_errors=True)
+    os.environ["JAGGED_QUIZ_DB"] = os.path.join(tmp, "load_test.db")
+    for name, directory in (
+        ("JAGGED_QUIZ_NORMS_DIR", "norms"), ("JAGGED_QUIZ_PEERS_DIR", "peers"),
+        ("JAGGED_QUIZ_COHORTS_DIR", "cohorts"), ("JAGGED_QUIZ_REPORTS_DIR", "reports"),
+    ):
+        os.environ[name] = os.path.join(tmp, directory)
+    report = run_load_test(args.sessions, args.concurrency, args.answer, args.back_rate, args.seed, args.timeout)
+
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    # AppTest runs the app as __main__ in the worker processes, so the functions
+    # they are sent must be looked up in the imported module, not in this script
+    import load_test
+
+    sys.exit(load_test.main())
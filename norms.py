@@ -0,0 +1,254 @@
+# norms.py
+
+"""
+Percentile norms: how a profile's normalized scores compare with everyone who
+completed the same quiz before.
+
+Normalized scores live on the bounded 0-5 scale and are shown to two decimals,
+so ScoreNorms keeps, per dimension, a histogram of completed scores at that
+resolution. This sketch is exact at the displayed precision, has a fixed size
+(D x 501 counts) however many profiles it has seen, merges across processes
+by adding counts, and answers percentile lookups from cumulative counts in
+O(1) per dimension.
+
+NormsStore persists one sketch per question bank as an .npz file. Each process
+buffers its new profiles in a delta sketch and a background thread periodically
+merges the delta into the file under an exclusive file lock, picking up what
+other processes have merged in the meantime.
+"""
+
+import atexit
+import logging
+import os
+import threading
+
+import numpy as np
+
+from scoring import MAX_ANSWER
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, where a single process is assumed
+    fcntl = None
+
+SCORE_RESOLUTION = 0.01
+BINS = int(round(MAX_ANSWER / SCORE_RESOLUTION)) + 1
+FLUSH_INTERVAL = 5.0
+
+logger = logging.getLogger(__name__)
+
+
+class ScoreNorms:
+    """Mergeable per-dimension histograms of completed normalized scores."""
+
+    def __init__(self, dimensions, counts=None):
+        self.dimensions = tuple(dimensions)
+        if counts is None:
+            counts = np.zeros((len(self.dimensions), BINS), dtype=np.int64)
+        elif counts.shape != (len(self.dimensions), BINS):
+            raise ValueError(f"expected counts of shape {(len(self.dimensions), BINS)}, got {counts.shape}")
+        self.counts = counts
+        self._cumulative = None
+
+    @property
+    def totals(self):
+        """Number of scores recorded per dimension."""
+        return self.counts.sum(axis=1)
+
+    def add(self, normalized):
+        """Records a normalized score vector (D,) or batch (N x D); NaN scores are skipped."""
+        scores = np.atleast_2d(np.asarray(normalized, dtype=np.float64))
+        rows, dims = np.nonzero(~np.isnan(scores))
+        bins = np.clip(np.rint(scores[rows, dims] / SCORE_RESOLUTION), 0, BINS - 1).astype(np.int64)
+        flat = np.bincount(dims * BINS + bins, minlength=self.counts.size)
+        self.counts += flat.reshape(self.counts.shape)
+        self._cumulative = None
+
+    def merge(self, other):
+        """Adds another sketch over the same dimensions into this one."""
+        if other.dimensions != self.dimensions:
+            raise ValueError("cannot merge norms over different dimensions")
+        self.counts += other.counts
+        self._cumulative = None
+        return self
+
+    def clear(self):
+        self.counts[:] = 0
+        self._cumulative = None
+
+    def percentiles(self, normalized):
+        """
+        Returns the percentile rank (0-100) of each score in a normalized score vector
+        among the recorded scores of its dimension: the share below it plus half the
+        share equal to it. NaN for unscored dimensions and dimensions with no data.
+        """
+        if self._cumulative is None:
+            self._cumulative = np.cumsum(self.counts, axis=1)
+        scores = np.asarray(normalized, dtype=np.float64)
+        result = np.full(len(self.dimensions), np.nan)
+        dims = np.flatnonzero(~np.isnan(scores))
+        bins = np.clip(np.rint(scores[dims] / SCORE_RESOLUTION), 0, BINS - 1).astype(np.int64)
+        totals = self._cumulative[dims, -1]
+        at_or_below = self._cumulative[dims, bins]
+        equal = self.counts[dims, bins]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result[dims] = np.where(totals > 0, (at_or_below - equal / 2) / totals * 100, np.nan)
+        return result
+
+    def quantiles(self, q):
+        """Returns the score at quantile `q` (0-1) for every dimension, NaN where there is no data."""
+        if self._cumulative is None:
+            self._cumulative = np.cumsum(self.counts, axis=1)
+        totals = self._cumulative[:, -1]
+        result = np.full(len(self.dimensions), np.nan)
+        for dim in np.flatnonzero(totals):
+            result[dim] = np.searchsorted(self._cumulative[dim], q * totals[dim]) * SCORE_RESOLUTION
+        return result
+
+    def save(self, path):
+        """Writes the sketch to an .npz file, replacing it atomically."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, dimensions=np.array(self.dimensions), counts=self.counts)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, dimensions):
+        """Reads a sketch saved by save(); returns an empty sketch if the file is missing."""
+        if not os.path.exists(path):
+            return cls(dimensions)
+        with np.load(path) as data:
+            if tuple(data["dimensions"].tolist()) != tuple(dimensions):
+                raise ValueError(f"{path} holds norms for different dimensions")
+            return cls(dimensions, data["counts"].astype(np.int64))
+
+
+def _file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class FileLock:
+    """An exclusive advisory lock on a lock file, held for the duration of a with block."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, "a")
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+
+class PeriodicFlusher:
+    """
+    Base for stores that buffer writes in memory: a background thread calls
+    flush() every `flush_interval` seconds, and close(), also run at exit, stops
+    it after a final flush. Subclasses implement flush() and call this __init__
+    once the state it uses is set up.
+    """
+
+    def __init__(self, flush_interval, name):
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(flush_interval,), name=name, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def flush(self):
+        raise NotImplementedError
+
+    def _run(self, flush_interval):
+        while not self._stopped.wait(flush_interval):
+            self.flush()
+
+    def close(self):
+        """Stops the background thread after a final flush."""
+        if not self._stopped.is_set():
+            self._stopped.set()
+            self.flush()
+
+
+class NormsStore(PeriodicFlusher):
+    """
+    Process-wide percentile norms per question bank, persisted under `directory`
+    as <bank fingerprint>.npz. Thread-safe; record() only updates memory.
+    """
+
+    def __init__(self, directory, flush_interval=FLUSH_INTERVAL):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # By bank fingerprint: merged view (file + local delta), and the local delta
+        self._views = {}
+        self._deltas = {}
+        self._file_stamps = {}
+        super().__init__(flush_interval, "norms-writer")
+
+    def _path(self, fingerprint):
+        return os.path.join(self.directory, f"{fingerprint}.npz")
+
+    def _view(self, fingerprint, dimensions):
+        view = self._views.get(fingerprint)
+        if view is None:
+            path = self._path(fingerprint)
+            view = self._views[fingerprint] = ScoreNorms.load(path, dimensions)
+            self._deltas[fingerprint] = ScoreNorms(dimensions)
+            self._file_stamps[fingerprint] = _file_stamp(path)
+        return view
+
+    def record(self, fingerprint, dimensions, normalized):
+        """Adds a completed profile's normalized scores to its bank's norms."""
+        with self._lock:
+            self._view(fingerprint, dimensions).add(normalized)
+            self._deltas[fingerprint].add(normalized)
+
+    def percentiles(self, fingerprint, dimensions, normalized):
+        """Returns the percentile rank (0-100) per dimension, see ScoreNorms.percentiles."""
+        with self._lock:
+            return self._view(fingerprint, dimensions).percentiles(normalized)
+
+    def total(self, fingerprint, dimensions):
+        """Returns how many completed profiles the bank's norms are based on."""
+        with self._lock:
+            totals = self._view(fingerprint, dimensions).totals
+            return int(totals.max()) if totals.size else 0
+
+    def flush(self):
+        """Merges every local delta into its file and reloads files changed by other processes."""
+        with self._lock:
+            pending = [
+                (fingerprint, self._views[fingerprint].dimensions, delta.counts.copy())
+                for fingerprint, delta in self._deltas.items()
+            ]
+            for delta in self._deltas.values():
+                delta.clear()
+        for fingerprint, dimensions, delta_counts in pending:
+            path = self._path(fingerprint)
+            try:
+                if delta_counts.any():
+                    with FileLock(f"{path}.lock"):
+                        merged = ScoreNorms.load(path, dimensions).merge(ScoreNorms(dimensions, delta_counts))
+                        merged.save(path)
+                elif _file_stamp(path) == self._file_stamps.get(fingerprint):
+                    continue
+                else:
+                    merged = ScoreNorms.load(path, dimensions)
+            except (OSError, ValueError):
+                logger.exception("Could not update the score norms in %s", path)
+                with self._lock:
+                    self._deltas[fingerprint].counts += delta_counts
+                continue
+            with self._lock:
+                # Keep what was recorded while the file was being written
+                self._views[fingerprint] = merged.merge(self._deltas[fingerprint])
+                self._file_stamps[fingerprint] = _file_stamp(path)
@@ -0,0 +1,244 @@
+# profiler.py
+
+"""
+Lightweight timing instrumentation for the app's hot paths.
+
+PROFILER collects per-stage timings in this process: wrap a stage in
+`with PROFILER.stage("name"):`, decorate a function with `@PROFILER.timed("name")`,
+or start a timer and stop it later. Each stage keeps a count, total and maximum
+plus a window of recent durations for percentiles. When profiling is disabled
+(JAGGED_QUIZ_PROFILE=0) stage() returns a shared no-op timer, so instrumented
+code pays for little more than an attribute lookup.
+
+The same numbers can be exported for production monitoring by MetricsExporter,
+which periodically writes them as a Prometheus text file (for node_exporter's
+textfile collector) and/or appends them as JSON lines to a log.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+import numpy as np
+
+PROFILING_ENABLED = os.environ.get("JAGGED_QUIZ_PROFILE", "1") != "0"
+# Recent durations kept per stage for the percentiles
+WINDOW = 1024
+METRIC_PREFIX = "jagged_quiz"
+
+logger = logging.getLogger(__name__)
+
+
+class _StageStats:
+    __slots__ = ("count", "total", "max", "recent")
+
+    def __init__(self, window):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)
+
+
+class _Timer:
+    __slots__ = ("profiler", "name", "started")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.started = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        return self
+
+    def stop(self):
+        if self.started is not None:
+            self.profiler.record(self.name, time.perf_counter() - self.started)
+            self.started = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def start(self):
+        return self
+
+    def stop(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Profiler:
+    """Thread-safe per-stage timing statistics for one process."""
+
+    def __init__(self, enabled=True, window=WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        """Returns a timer for `name`, usable as a context manager or with start()/stop()."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def timed(self, name=None):
+        """Decorator that times every call of a function as stage `name` (default: its name)."""
+        def decorator(func):
+            stage_name = name or func.__name__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(stage_name, time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    def record(self, name, seconds):
+        """Adds one duration to a stage's statistics."""
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = _StageStats(self.window)
+            stats.count += 1
+            stats.total += seconds
+            if seconds > stats.max:
+                stats.max = seconds
+            stats.recent.append(seconds)
+
+    def snapshot(self):
+        """
+        Returns {stage: {count, total_s, mean_s, max_s, p50_s, p95_s, p99_s}}, with the
+        percentiles over the stage's most recent `window` durations.
+        """
+        with self._lock:
+            stages = {
+                name: (stats.count, stats.total, stats.max, np.array(stats.recent))
+                for name, stats in self._stages.items()
+            }
+        snapshot = {}
+        for name, (count, total, max_seconds, recent) in sorted(stages.items()):
+            p50, p95, p99 = np.percentile(recent, [50, 95, 99])
+            snapshot[name] = {
+                "count": count,
+                "total_s": total,
+                "mean_s": total / count,
+                "max_s": max_seconds,
+                "p50_s": float(p50),
+                "p95_s": float(p95),
+                "p99_s": float(p99),
+            }
+        return snapshot
+
+    def reset(self):
+        """Forgets every recorded timing."""
+        with self._lock:
+            self._stages.clear()
+
+
+PROFILER = Profiler(enabled=PROFILING_ENABLED)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(stages, caches=None):
+    """
+    Formats a Profiler snapshot, and optional cache counters as {cache: {"hits",
+    "misses"}}, in the Prometheus text exposition format.
+    """
+    lines = [
+        f"# HELP {METRIC_PREFIX}_stage_seconds Time spent in each instrumented stage.",
+        f"# TYPE {METRIC_PREFIX}_stage_seconds summary",
+    ]
+    for name, stats in stages.items():
+        stage = _label(name)
+        for quantile, key in (("0.5", "p50_s"), ("0.95", "p95_s"), ("0.99", "p99_s")):
+            lines.append(f'{METRIC_PREFIX}_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {stats[key]!r}')
+        lines.append(f'{METRIC_PREFIX}_stage_seconds_sum{{stage="{stage}"}} {stats["total_s"]!r}')
+        lines.append(f'{METRIC_PREFIX}_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+    lines.append(f"# HELP {METRIC_PREFIX}_stage_seconds_max Slowest recorded duration of each stage.")
+    lines.append(f"# TYPE {METRIC_PREFIX}_stage_seconds_max gauge")
+    for name, stats in stages.items():
+        lines.append(f'{METRIC_PREFIX}_stage_seconds_max{{stage="{_label(name)}"}} {stats["max_s"]!r}')
+    for counter in ("hits", "misses"):
+        lines.append(f"# HELP {METRIC_PREFIX}_cache_{counter}_total Cache lookups that were {counter}.")
+        lines.append(f"# TYPE {METRIC_PREFIX}_cache_{counter}_total counter")
+        for cache, counts in (caches or {}).items():
+            lines.append(f'{METRIC_PREFIX}_cache_{counter}_total{{cache="{_label(cache)}"}} {counts[counter]}')
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """
+    Writes the metrics returned by `collect()`, a (stages, caches) pair as taken by
+    prometheus_text, every `interval` seconds from a daemon thread and once more at
+    exit. The Prometheus file is replaced atomically; the JSON log gets one line
+    per export.
+    """
+
+    def __init__(self, collect, prometheus_path=None, jsonl_path=None, interval=10.0):
+        self.collect = collect
+        self.prometheus_path = prometheus_path
+        self.jsonl_path = jsonl_path
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def export(self):
+        """Writes the current metrics to the configured destinations."""
+        stages, caches = self.collect()
+        with self._lock:
+            if self.prometheus_path:
+                tmp_path = f"{self.prometheus_path}.tmp"
+                with open(tmp_path, "w") as f:
+                    f.write(prometheus_text(stages, caches))
+                os.replace(tmp_path, self.prometheus_path)
+            if self.jsonl_path:
+                with open(self.jsonl_path, "a") as f:
+                    f.write(json.dumps({"time": time.time(), "pid": os.getpid(), "stages": stages, "caches": caches}) + "\n")
+
+    def _export_logged(self):
+        try:
+            self.export()
+        except OSError:
+            logger.exception("Could not export metrics")
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._export_logged()
+
+    def close(self):
+        """Stops the export thread after a final export."""
+        if not self._stopped.is_set():
+            self._stopped.set()
+            self._export_logged()
@@ -0,0 +1,308 @@
+# quiz_bank.py
+
+"""
+Question banks for the Jagged Learning Profile Quiz.
+
+A bank is a JSON (or YAML, if PyYAML is installed) file with a title, a list of
+questions and the learning paths and careers per dimension:
+
+    {
+      "title": "Jagged Learning Profile Quiz",
+      "questions": [
+        {"question": "...", "primary_dimension": "...", "secondary_weights": {"...": 0.4}},
+        ...
+      ],
+      "learning_paths_and_careers": {"<dimension>": {"learning": [...], "careers": [...]}},
+      "careers": [{"name": "...", "weights": {"<dimension>": 0.8, ...}}, ...]
+    }
+
+The optional "careers" catalogue gives careers their own dimension-weight profile
+for whole-profile recommendations; without it, the careers listed per dimension
+are recommended instead.
+
+Several banks (e.g. per age group or language) can live side by side in the
+banks/ directory and are addressed by file stem, see bank_path().
+
+load_model() validates a bank file once and compiles it into an immutable
+QuizModel, cached per file in a bounded LRU (MODEL_CACHE). Every call re-checks
+the file's mtime and size, and only a change in the file's content hash
+triggers a recompile, so edits to a bank take effect without restarting the app
+and without parsing per request.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from scoring import compile_model
+
+BANKS_DIR = Path(__file__).resolve().parent / "banks"
+DEFAULT_BANK_PATH = BANKS_DIR / "default.json"
+BANK_SUFFIXES = (".json", ".yaml", ".yml")
+# Bank names come from URLs, so only plain file stems are accepted
+BANK_NAME_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+logger = logging.getLogger(__name__)
+
+
+class BankError(ValueError):
+    """Raised when a question bank file is malformed."""
+
+
+def parse_bank(content, source):
+    """Parses the text of a bank file, as YAML for .yaml/.yml files and JSON otherwise."""
+    if Path(source).suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as exc:
+            raise BankError(f"{source}: PyYAML is required to load YAML question banks") from exc
+        try:
+            return yaml.safe_load(content)
+        except yaml.YAMLError as exc:
+            raise BankError(f"{source}: invalid YAML: {exc}") from exc
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError as exc:
+        raise BankError(f"{source}: invalid JSON: {exc}") from exc
+
+
+def validate_bank(bank, source):
+    """Checks the structure of a parsed bank, raising BankError on the first problem."""
+    if not isinstance(bank, dict):
+        raise BankError(f"{source}: a bank must be a mapping with a 'questions' list")
+    questions = bank.get("questions")
+    if not isinstance(questions, list) or not questions:
+        raise BankError(f"{source}: 'questions' must be a non-empty list")
+
+    seen = set()
+    for qi, q_data in enumerate(questions):
+        where = f"{source}: question {qi}"
+        if not isinstance(q_data, dict):
+            raise BankError(f"{where}: must be a mapping")
+        text = q_data.get("question")
+        if not isinstance(text, str) or not text.strip():
+            raise BankError(f"{where}: 'question' must be a non-empty string")
+        if text in seen:
+            raise BankError(f"{where}: duplicate question {text!r}")
+        seen.add(text)
+        if not isinstance(q_data.get("primary_dimension"), str) or not q_data["primary_dimension"]:
+            raise BankError(f"{where}: 'primary_dimension' must be a non-empty string")
+        secondary_weights = q_data.setdefault("secondary_weights", {})
+        if not isinstance(secondary_weights, dict):
+            raise BankError(f"{where}: 'secondary_weights' must be a mapping of dimension to weight")
+        for dim, weight in secondary_weights.items():
+            if not isinstance(weight, (int, float)) or isinstance(weight, bool) or weight < 0:
+                raise BankError(f"{where}: weight for {dim!r} must be a non-negative number")
+
+    careers = bank.get("learning_paths_and_careers", {})
+    if not isinstance(careers, dict):
+        raise BankError(f"{source}: 'learning_paths_and_careers' must be a mapping by dimension")
+    for dim, paths in careers.items():
+        if not isinstance(paths, dict) or not all(
+            isinstance(paths.get(kind, []), list) for kind in ("learning", "careers")
+        ):
+            raise BankError(f"{source}: paths for {dim!r} must have 'learning' and 'careers' lists")
+
+    catalogue = bank.get("careers")
+    if catalogue is None:
+        return
+    if not isinstance(catalogue, list):
+        raise BankError(f"{source}: 'careers' must be a list")
+    dimensions = {q["primary_dimension"] for q in questions} | {dim for q in questions for dim in q["secondary_weights"]}
+    for ci, career in enumerate(catalogue):
+        where = f"{source}: career {ci}"
+        if not isinstance(career, dict) or not isinstance(career.get("name"), str) or not career["name"]:
+            raise BankError(f"{where}: must be a mapping with a non-empty 'name'")
+        weights = career.get("weights")
+        if not isinstance(weights, dict) or not weights:
+            raise BankError(f"{where}: 'weights' must be a non-empty mapping of dimension to weight")
+        for dim, weight in weights.items():
+            if dim not in dimensions:
+                raise BankError(f"{where}: unknown dimension {dim!r}")
+            if not isinstance(weight, (int, float)) or isinstance(weight, bool) or weight < 0:
+                raise BankError(f"{where}: weight for {dim!r} must be a non-negative number")
+
+
+def compile_bank(bank, source="<bank>"):
+    """Validates a parsed bank and compiles it into a QuizModel."""
+    validate_bank(bank, source)
+    return compile_model(
+        bank["questions"],
+        bank.get("learning_paths_and_careers", {}),
+        title=bank.get("title", ""),
+        careers=bank.get("careers"),
+    )
+
+
+class _CachedModel:
+    __slots__ = ("stamp", "content_hash", "model", "nbytes", "load_seconds", "loaded_at")
+
+    def __init__(self, stamp, content_hash, model, nbytes, load_seconds):
+        self.stamp = stamp
+        self.content_hash = content_hash
+        self.model = model
+        self.nbytes = nbytes
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+
+
+def estimate_model_bytes(model, source_bytes):
+    """Approximates a model's memory footprint from its arrays and its bank file's size."""
+    arrays = model.weights.nbytes + model.max_score_vector.nbytes + model.careers.nbytes + sum(
+        dims.nbytes + weights.nbytes for dims, weights in model.question_weights
+    )
+    # The question and career dicts cost a few times their serialized size
+    return arrays + 4 * source_bytes
+
+
+class ModelCache:
+    """
+    A thread-safe LRU of compiled models by bank file path, bounded by the number
+    of models and their estimated total size, so rarely used banks do not pin
+    memory. Tracks hits, loads, evictions and how long each model took to load.
+    """
+
+    def __init__(self, max_models=32, max_bytes=256 * 1024 * 1024):
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    def get(self, path):
+        """
+        Returns the compiled QuizModel for a bank file. A changed mtime or size makes
+        the file be re-read, and it is recompiled only if its content hash differs.
+        If an edited file fails to validate, the error is logged and the previously
+        compiled model keeps being served until the file is fixed; a bank that has
+        never loaded successfully, or whose file is gone, raises BankError. Files are
+        read and compiled outside the lock, so concurrent requests for other banks
+        are not held up.
+        """
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError as exc:
+            raise BankError(f"{path}: cannot read the bank file: {exc.strerror}") from exc
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is not None:
+                self._entries.move_to_end(path)
+                if cached.stamp == stamp:
+                    self.hits += 1
+                    return cached.model
+
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except OSError as exc:
+            if cached is None:
+                raise BankError(f"{path}: cannot read the bank file: {exc.strerror}") from exc
+            logger.exception("Keeping the previous version of %s", path)
+            return cached.model
+        content_hash = hashlib.sha256(content).hexdigest()
+        if cached is not None and cached.content_hash == content_hash:
+            with self._lock:
+                cached.stamp = stamp
+                self.hits += 1
+            return cached.model
+        start = time.perf_counter()
+        try:
+            model = compile_bank(parse_bank(content.decode("utf-8"), path), path)
+        except BankError:
+            if cached is None:
+                raise
+            logger.exception("Keeping the previous version of %s", path)
+            with self._lock:
+                cached.stamp = stamp
+            return cached.model
+        load_seconds = time.perf_counter() - start
+
+        with self._lock:
+            self.loads += 1
+            self.load_seconds += load_seconds
+            # Another thread may have compiled the same content meanwhile; keep its model
+            current = self._entries.get(path)
+            if current is not None and current.content_hash == content_hash:
+                self._entries.move_to_end(path)
+                return current.model
+            if current is not None:
+                self.size_bytes -= current.nbytes
+            entry = _CachedModel(stamp, content_hash, model, estimate_model_bytes(model, len(content)), load_seconds)
+            self._entries[path] = entry
+            self._entries.move_to_end(path)
+            self.size_bytes += entry.nbytes
+            # Evict least recently used models, but never the one just loaded
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_models or self.size_bytes > self.max_bytes
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= evicted.nbytes
+                self.evictions += 1
+            return model
+
+    def stats(self):
+        """Returns cache counters and, per resident model, its size and load time."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "load_seconds": self.load_seconds,
+                "size_bytes": self.size_bytes,
+                "models": [
+                    {
+                        "path": path,
+                        "title": entry.model.title,
+                        "questions": len(entry.model.questions),
+                        "nbytes": entry.nbytes,
+                        "load_seconds": entry.load_seconds,
+                        "loaded_at": entry.loaded_at,
+                    }
+                    for path, entry in self._entries.items()
+                ],
+            }
+
+
+MODEL_CACHE = ModelCache(
+    max_models=int(os.environ.get("JAGGED_QUIZ_MAX_MODELS", 32)),
+    max_bytes=int(os.environ.get("JAGGED_QUIZ_MODEL_CACHE_BYTES", 256 * 1024 * 1024)),
+)
+
+
+def load_model(path=DEFAULT_BANK_PATH):
+    """Returns the compiled QuizModel for a bank file from the process-wide MODEL_CACHE."""
+    return MODEL_CACHE.get(path)
+
+
+def bank_path(name):
+    """
+    Returns the path of the bank called `name` in BANKS_DIR (banks/<name>.json, .yaml
+    or .yml). Raises BankError for names that are not a plain file stem or unknown.
+    """
+    if not BANK_NAME_PATTERN.fullmatch(name or ""):
+        raise BankError(f"Invalid quiz name {name!r}")
+    for suffix in BANK_SUFFIXES:
+        path = BANKS_DIR / f"{name}{suffix}"
+        if path.is_file():
+            return path
+    raise BankError(f"Unknown quiz {name!r}")
+
+
+def available_banks():
+    """Returns the names of all banks in BANKS_DIR."""
+    return sorted(
+        path.stem for path in BANKS_DIR.iterdir()
+        if path.suffix.lower() in BANK_SUFFIXES and BANK_NAME_PATTERN.fullmatch(path.stem)
+    )
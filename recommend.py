@@ -0,0 +1,131 @@
+# recommend.py
+
+"""
+Career recommendations for whole score profiles.
+
+A CareerIndex holds a catalogue of careers as one row per career of a
+(careers x dimensions) float32 matrix over a model's dimensions. Each row is the
+career's dimension-weight profile, centred on its mean and scaled to unit
+length, so a matrix product with a centred, unit-length score vector gives the
+cosine similarity of every career at once. Centring makes the match depend on a
+profile's shape (its relative strengths) rather than on its overall level.
+Top-k uses argpartition, so only the k best careers are ever sorted.
+"""
+
+import numpy as np
+
+DEFAULT_TOP_K = 5
+# Profiles scored per matrix product in recommend(), bounding the (batch x careers)
+# similarity block to a few tens of MB for large catalogues
+BATCH_ROWS = 256
+
+
+def _centred_unit_rows(matrix):
+    """Centres each row on its mean and scales it to unit length (zero rows stay zero)."""
+    centred = matrix - matrix.mean(axis=-1, keepdims=True)
+    norms = np.linalg.norm(centred, axis=-1, keepdims=True)
+    return np.divide(centred, norms, out=np.zeros_like(centred), where=norms > 0)
+
+
+def fill_unscored(scores):
+    """
+    Returns a float score vector (D,) or batch (N x D), keeping its dtype, with
+    unscored (NaN) dimensions set to the profile's average (0 if none is scored).
+    """
+    scored = ~np.isnan(scores)
+    counts = scored.sum(axis=-1, keepdims=True)
+    means = np.divide(np.where(scored, scores, 0).sum(axis=-1, keepdims=True), counts,
+                      out=np.zeros(counts.shape, dtype=scores.dtype), where=counts > 0)
+    return np.where(scored, scores, means)
+
+
+def centred_profiles(scores):
+    """
+    Returns a normalized score vector (D,) or batch (N x D) as centred, unit-length
+    float32 profiles, with unscored (NaN) dimensions counted as the profile's average.
+    """
+    return _centred_unit_rows(fill_unscored(np.asarray(scores, dtype=np.float32)))
+
+
+class CareerIndex:
+    """A read-only catalogue of careers, searchable by cosine similarity to score profiles."""
+
+    def __init__(self, names, profiles):
+        profiles = np.asarray(profiles, dtype=np.float32)
+        if profiles.ndim != 2 or profiles.shape[0] != len(names):
+            raise ValueError("profiles must be a (careers x dimensions) matrix with one row per name")
+        self.names = tuple(names)
+        self.matrix = _centred_unit_rows(profiles)
+        self.matrix.flags.writeable = False
+
+    @classmethod
+    def from_catalogue(cls, catalogue, dimensions):
+        """
+        Builds an index from a list of {"name": ..., "weights": {dimension: weight}}
+        entries over the given dimensions.
+        """
+        dim_index = {dim: i for i, dim in enumerate(dimensions)}
+        profiles = np.zeros((len(catalogue), len(dimensions)), dtype=np.float32)
+        for row, career in enumerate(catalogue):
+            for dim, weight in career["weights"].items():
+                profiles[row, dim_index[dim]] = weight
+        return cls([career["name"] for career in catalogue], profiles)
+
+    @classmethod
+    def from_learning_paths(cls, learning_paths_and_careers, dimensions):
+        """
+        Builds an index from a bank's per-dimension career lists: each career gets
+        weight 1 on every dimension that lists it.
+        """
+        weights = {}
+        for dim, paths in learning_paths_and_careers.items():
+            if dim in dimensions:
+                for name in paths.get("careers", []):
+                    weights.setdefault(name, {})[dim] = 1.0
+        return cls.from_catalogue(
+            [{"name": name, "weights": career_weights} for name, career_weights in weights.items()], dimensions
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def nbytes(self):
+        return self.matrix.nbytes
+
+    def similarities(self, scores):
+        """
+        Returns the cosine similarity of every career to a normalized score vector
+        (D,) or batch (N x D). Unscored (NaN) dimensions count as average.
+        """
+        return centred_profiles(scores) @ self.matrix.T
+
+    def recommend(self, scores, k=DEFAULT_TOP_K):
+        """
+        Returns (indices, similarities) of the k best matching careers, best first,
+        for a score vector (D,) -> (k,) arrays or a batch (N x D) -> (N x k) arrays.
+        Batches are scored BATCH_ROWS profiles at a time.
+        """
+        scores = np.asarray(scores, dtype=np.float32)
+        if scores.ndim == 1:
+            indices, similarities = self.recommend(scores[None, :], k)
+            return indices[0], similarities[0]
+
+        k = min(k, len(self.names))
+        indices = np.empty((len(scores), k), dtype=np.int64)
+        best = np.empty((len(scores), k), dtype=np.float32)
+        if k == 0:
+            return indices, best
+        for start in range(0, len(scores), BATCH_ROWS):
+            block = self.similarities(scores[start:start + BATCH_ROWS])
+            top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+            top_similarities = np.take_along_axis(block, top, axis=1)
+            order = np.argsort(-top_similarities, axis=1, kind="stable")
+            indices[start:start + len(block)] = np.take_along_axis(top, order, axis=1)
+            best[start:start + len(block)] = np.take_along_axis(top_similarities, order, axis=1)
+        return indices, best
+
+    def top_careers(self, scores, k=DEFAULT_TOP_K):
+        """Returns [(career name, similarity), ...] of the k best matches for one score vector."""
+        indices, similarities = self.recommend(scores, k)
+        return [(self.names[i], float(similarity)) for i, similarity in zip(indices, similarities)]
@@ -0,0 +1,199 @@
+# reports.py
+
+"""
+Downloadable one-page profile reports, rendered in the background.
+
+A report shows a profile's radar chart, its score table and its career
+suggestions, drawn with matplotlib's Agg backend through the object-oriented
+Figure API (no pyplot state), so reports can render on worker threads.
+
+ReportQueue renders reports on a bounded thread pool and caches the finished
+files on disk, named by a hash of the report's content: a profile that has been
+rendered before (by anyone, in any process sharing the directory) is served
+straight from disk, and the Streamlit script never waits for a render. Callers
+submit a report and poll status() until it is "ready".
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from scoring import MAX_ANSWER
+
+REPORT_FORMATS = {"pdf": "application/pdf", "png": "image/png"}
+# Bumped whenever the report layout changes, so cached files are re-rendered
+REPORT_VERSION = 1
+# A4 portrait, in inches
+PAGE_SIZE = (8.27, 11.69)
+
+logger = logging.getLogger(__name__)
+
+
+def report_payload(model, normalized, top_k=3, career_matches=5):
+    """
+    Collects everything a profile's report shows into a JSON-serializable dict:
+    the quiz title, the scored dimensions with scores rounded to the displayed
+    precision, the top dimensions' learning paths and careers, and the best
+    whole-profile career matches.
+    """
+    scored = [(dim, round(float(normalized[i]), 2)) for i, dim in enumerate(model.dimensions) if not np.isnan(normalized[i])]
+    ranked = sorted(scored, key=lambda item: -item[1])
+    return {
+        "title": model.title or "Jagged Learning Profile",
+        "bank": model.fingerprint,
+        "scores": scored,
+        "strengths": [
+            {
+                "dimension": dim,
+                "score": score,
+                "learning": model.learning_paths_and_careers.get(dim, {}).get("learning", []),
+                "careers": model.learning_paths_and_careers.get(dim, {}).get("careers", []),
+            }
+            for dim, score in ranked[:top_k]
+        ],
+        "career_matches": [name for name, _ in model.careers.top_careers(normalized, k=career_matches)],
+    }
+
+
+def report_key(payload, fmt):
+    """Returns the content hash that names a report's file in the cache."""
+    content = json.dumps([REPORT_VERSION, fmt, payload], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def render_report(payload, path, fmt="pdf"):
+    """Renders a report payload to `path` as a one-page PDF or PNG."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=PAGE_SIZE)
+    FigureCanvasAgg(fig)
+    fig.suptitle(payload["title"], fontsize=18, fontweight="bold", color="#4CAF50", y=0.97)
+
+    # Radar chart of every scored dimension, closed back onto the first point
+    dims = [dim for dim, _ in payload["scores"]]
+    scores = [score for _, score in payload["scores"]]
+    radar = fig.add_axes([0.2, 0.6, 0.6, 0.32], projection="polar")
+    if dims:
+        angles = np.linspace(0, 2 * np.pi, len(dims), endpoint=False)
+        radar.plot(np.append(angles, angles[0]), scores + scores[:1], color="#440154")
+        radar.fill(np.append(angles, angles[0]), scores + scores[:1], color="#440154", alpha=0.25)
+        radar.set_xticks(angles)
+        radar.set_xticklabels(dims, fontsize=7)
+    radar.set_ylim(0, MAX_ANSWER)
+    radar.set_yticks(range(1, MAX_ANSWER + 1))
+    radar.tick_params(axis="y", labelsize=7)
+
+    # Score table, best first
+    table_ax = fig.add_axes([0.08, 0.3, 0.4, 0.25])
+    table_ax.axis("off")
+    rows = [[dim, f"{score:.2f}"] for dim, score in sorted(payload["scores"], key=lambda item: -item[1])]
+    if rows:
+        table = table_ax.table(cellText=rows, colLabels=["Dimension", "Score"], loc="upper center", colWidths=[0.85, 0.2])
+        table.auto_set_font_size(False)
+        table.set_fontsize(7)
+
+    # Career suggestions
+    lines = ["Top strengths"]
+    for strength in payload["strengths"]:
+        lines.append(f"{strength['dimension']} ({strength['score']:.2f})")
+        if strength["learning"]:
+            lines.append("  Explore: " + ", ".join(strength["learning"]))
+        if strength["careers"]:
+            lines.append("  Careers: " + ", ".join(strength["careers"]))
+    if payload["career_matches"]:
+        lines += ["", "Careers that match your whole profile"] + [f"  {name}" for name in payload["career_matches"]]
+    fig.text(0.52, 0.55, "\n".join(lines), fontsize=7.5, va="top", wrap=True)
+
+    fig.savefig(path, format=fmt, dpi=150 if fmt == "png" else None)
+
+
+class ReportQueue:
+    """
+    Renders reports in the background on `workers` threads, accepting at most
+    `max_pending` unfinished reports at a time, and keeps up to `max_files`
+    finished reports in `directory`. Thread-safe.
+    """
+
+    def __init__(self, directory, workers=2, max_pending=64, max_files=10_000):
+        self.directory = directory
+        self.max_pending = max_pending
+        self.max_files = max_files
+        os.makedirs(directory, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report")
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._failed = set()
+
+    def path(self, key, fmt):
+        """Returns the path of a report's file in the cache."""
+        return os.path.join(self.directory, f"{key}.{fmt}")
+
+    def status(self, key, fmt):
+        """Returns "ready", "pending", "failed" or "missing" for a report."""
+        with self._lock:
+            if key in self._pending:
+                return "pending"
+            if key in self._failed:
+                return "failed"
+        return "ready" if os.path.exists(self.path(key, fmt)) else "missing"
+
+    def submit(self, payload, fmt="pdf"):
+        """
+        Queues a report for rendering unless it is already cached or queued, and
+        returns (key, status). The status is "busy" if the queue is full.
+        """
+        key = report_key(payload, fmt)
+        with self._lock:
+            if key in self._pending:
+                return key, "pending"
+            if os.path.exists(self.path(key, fmt)):
+                return key, "ready"
+            if len(self._pending) >= self.max_pending:
+                return key, "busy"
+            self._failed.discard(key)
+            self._pending[key] = self._executor.submit(self._render, key, payload, fmt)
+        return key, "pending"
+
+    def read(self, key, fmt):
+        """Returns the bytes of a finished report, or None if it is not in the cache."""
+        try:
+            with open(self.path(key, fmt), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _render(self, key, payload, fmt):
+        path = self.path(key, fmt)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            render_report(payload, tmp_path, fmt)
+            os.replace(tmp_path, path)
+        except Exception:
+            logger.exception("Could not render report %s", key)
+            with self._lock:
+                self._failed.add(key)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+        self._prune()
+
+    def _prune(self):
+        """Deletes the oldest cached reports beyond max_files."""
+        with os.scandir(self.directory) as entries:
+            files = [entry for entry in entries if entry.is_file() and not entry.name.endswith(".tmp")]
+        if len(files) <= self.max_files:
+            return
+        files.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in files[:len(files) - self.max_files]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
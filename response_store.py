@@ -0,0 +1,269 @@
+# response_store.py
+
+"""
+Persistent storage for quiz sessions and answers.
+
+ResponseStore keeps every session's question order, progress and answers in a
+SQLite database in WAL mode. Writes never touch the disk on the caller's thread:
+they are buffered in memory (later writes to the same answer replace earlier
+ones) and a background writer thread flushes them in batched transactions every
+FLUSH_INTERVAL seconds, or sooner once MAX_BATCH writes are waiting.
+Sessions are identified by a random token and can be resumed with it.
+Sessions completed by the app's debug tools are flagged `debug`, so analyses of
+real submissions can leave their made-up answers out.
+"""
+
+import atexit
+import logging
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+FLUSH_INTERVAL = 0.25
+MAX_BATCH = 500
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    token TEXT PRIMARY KEY,
+    bank_fingerprint TEXT NOT NULL,
+    question_order BLOB NOT NULL,
+    current_question INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    completed_at REAL,
+    debug INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS answers (
+    token TEXT NOT NULL,
+    question_index INTEGER NOT NULL,
+    answer INTEGER NOT NULL,
+    answered_at REAL NOT NULL,
+    PRIMARY KEY (token, question_index)
+) WITHOUT ROWID;
+"""
+
+
+class ResponseStore:
+    """
+    Repository for quiz sessions backed by SQLite, with write-behind batching.
+    All public methods are thread-safe; the write methods only update in-memory
+    buffers and return immediately.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flushed = threading.Condition(self._lock)
+        self._new_sessions = {}
+        self._progress = {}
+        self._orders = {}
+        self._answers = {}
+        # The batch the writer thread is writing, taken from the buffers above
+        self._writing = ({}, {}, {}, {})
+        self._pending = 0
+        self._flush_waiters = 0
+        self._batches_taken = 0
+        self._batches_written = 0
+        self._closed = False
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._migrate(conn)
+
+        self._writer = threading.Thread(target=self._run_writer, name="response-store-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    @staticmethod
+    def _migrate(conn):
+        """Adds the columns introduced since a database was created."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+        if "debug" not in columns:
+            try:
+                conn.execute("ALTER TABLE sessions ADD COLUMN debug INTEGER NOT NULL DEFAULT 0")
+            except sqlite3.OperationalError:
+                # Another process added it first
+                if not any(row[1] == "debug" for row in conn.execute("PRAGMA table_info(sessions)")):
+                    raise
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # --- Buffered writes ---
+
+    def _buffer(self, table, key, value):
+        with self._lock:
+            table[key] = value
+            self._pending += 1
+            if self._pending >= MAX_BATCH:
+                self._wakeup.notify()
+
+    def create_session(self, token, question_order, bank_fingerprint):
+        """Registers a new session with its question order (indices into the bank)."""
+        order = np.asarray(question_order, dtype=np.uint16).tobytes()
+        self._buffer(self._new_sessions, token, (bank_fingerprint, order, time.time()))
+
+    def set_question_order(self, token, question_order):
+        """Replaces a session's question order, e.g. after adaptive selection reordered it."""
+        order = np.asarray(question_order, dtype=np.uint16).tobytes()
+        self._buffer(self._orders, token, order)
+
+    def record_answer(self, token, question_index, answer):
+        """Stores the answer (1-5, or 0 for cleared) to one question of a session."""
+        self._buffer(self._answers, (token, int(question_index)), (int(answer), time.time()))
+
+    def record_answers(self, token, answers):
+        """Stores every non-zero answer of a full answer vector in question-bank order."""
+        now = time.time()
+        answered = np.flatnonzero(answers)
+        with self._lock:
+            for question_index in answered:
+                self._answers[(token, int(question_index))] = (int(answers[question_index]), now)
+            self._pending += len(answered)
+            if self._pending >= MAX_BATCH:
+                self._wakeup.notify()
+
+    def set_progress(self, token, current_question, completed=False, debug=False):
+        """
+        Stores the question the session is on and whether it has been submitted;
+        `debug` marks a submission made up by the debug tools.
+        """
+        self._buffer(self._progress, token, (int(current_question), completed, debug, time.time()))
+
+    # --- Reads ---
+
+    def load_session(self, token):
+        """
+        Returns the stored state of a session as a dict with question_order, answers
+        (int8 array in bank order, 0 = unanswered), current_question, completed and
+        bank_fingerprint, or None if the token is unknown. If the session has writes
+        still pending they are flushed first, so the result reflects everything
+        recorded so far; other lookups, such as of unknown tokens, never wait.
+        """
+        with self._lock:
+            pending = self._has_pending(token)
+        if pending:
+            self.flush()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT bank_fingerprint, question_order, current_question, completed_at "
+                "FROM sessions WHERE token = ?", (token,)
+            ).fetchone()
+            if row is None:
+                return None
+            answer_rows = conn.execute(
+                "SELECT question_index, answer FROM answers WHERE token = ?", (token,)
+            ).fetchall()
+        question_order = np.frombuffer(row[1], dtype=np.uint16).copy()
+        answers = np.zeros(len(question_order), dtype=np.int8)
+        for question_index, answer in answer_rows:
+            if question_index < len(answers):
+                answers[question_index] = answer
+        return {
+            "bank_fingerprint": row[0],
+            "question_order": question_order,
+            "answers": answers,
+            "current_question": row[2],
+            "completed": row[3] is not None,
+        }
+
+    def _has_pending(self, token):
+        """Returns whether writes to a session are buffered or being written. Call with the lock held."""
+        buffered = (self._new_sessions, self._progress, self._orders, self._answers)
+        for new_sessions, progress, orders, answers in (buffered, self._writing):
+            if token in new_sessions or token in progress or token in orders:
+                return True
+            if any(key[0] == token for key in answers):
+                return True
+        return False
+
+    # --- Writer thread ---
+
+    def _take_batch(self):
+        batch = self._writing = (self._new_sessions, self._progress, self._orders, self._answers)
+        self._new_sessions, self._progress, self._orders, self._answers = {}, {}, {}, {}
+        self._pending = 0
+        return batch
+
+    def _write_batch(self, conn, new_sessions, progress, orders, answers):
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO sessions (token, bank_fingerprint, question_order, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(token, fp, order, ts, ts) for token, (fp, order, ts) in new_sessions.items()],
+            )
+            conn.executemany(
+                "INSERT INTO answers (token, question_index, answer, answered_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (token, question_index) DO UPDATE SET answer = excluded.answer, answered_at = excluded.answered_at",
+                [(token, qi, answer, ts) for (token, qi), (answer, ts) in answers.items()],
+            )
+            conn.executemany(
+                "UPDATE sessions SET current_question = ?, updated_at = ?, "
+                "completed_at = CASE WHEN ? THEN COALESCE(completed_at, ?) ELSE completed_at END, "
+                "debug = CASE WHEN ? AND completed_at IS NULL THEN ? ELSE debug END "
+                "WHERE token = ?",
+                [
+                    (current, ts, completed, ts, completed, debug, token)
+                    for token, (current, completed, debug, ts) in progress.items()
+                ],
+            )
+            conn.executemany(
+                "UPDATE sessions SET question_order = ? WHERE token = ?",
+                [(order, token) for token, order in orders.items()],
+            )
+
+    def _run_writer(self):
+        conn = self._connect()
+        try:
+            while True:
+                with self._lock:
+                    if self._pending < MAX_BATCH and not self._flush_waiters and not self._closed:
+                        self._wakeup.wait(FLUSH_INTERVAL)
+                    batch = self._take_batch()
+                    self._batches_taken += 1
+                    batch_id = self._batches_taken
+                    closed = self._closed
+                if any(batch):
+                    try:
+                        self._write_batch(conn, *batch)
+                    except sqlite3.Error:
+                        logger.exception("Dropped a batch of quiz responses that could not be written")
+                with self._lock:
+                    self._writing = ({}, {}, {}, {})
+                    self._batches_written = batch_id
+                    self._flushed.notify_all()
+                if closed:
+                    return
+        finally:
+            conn.close()
+
+    def flush(self, timeout=10):
+        """Blocks until everything buffered before this call has been written."""
+        with self._lock:
+            if self._closed:
+                return
+            # The next batch the writer takes contains everything buffered so far
+            target = self._batches_taken + 1
+            self._flush_waiters += 1
+            self._wakeup.notify()
+            try:
+                self._flushed.wait_for(lambda: self._batches_written >= target, timeout)
+            finally:
+                self._flush_waiters -= 1
+
+    def close(self):
+        """Writes any buffered data and stops the writer thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wakeup.notify()
+        self._writer.join()
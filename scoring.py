@@ -0,0 +1,222 @@
+# scoring.py
+
+"""
+Scoring model for the quiz: the answer scale, the compiled QuizModel for a
+question bank and the score helpers that run against it.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass
+
+import numpy as np
+
+from recommend import CareerIndex
+
+# Likert answer options shown for every question. An answer is stored as the label,
+# and its numeric value (1-5) is the position in this list plus one.
+ANSWER_OPTIONS = ["1 - 😞", "2 - 😐", "3 - 👍", "4 - 😄", "5 - 😎"]
+ANSWER_VALUES = {label: value for value, label in enumerate(ANSWER_OPTIONS, start=1)}
+MAX_ANSWER = len(ANSWER_OPTIONS)
+
+
+def collect_dimensions(questions):
+    """Returns every primary and secondary dimension used by the questions, sorted."""
+    return sorted(set([q["primary_dimension"] for q in questions] + [dim for q in questions for dim in q["secondary_weights"]]))
+
+
+def compile_weight_matrix(questions, dimensions):
+    """
+    Compiles a question bank into a dense (questions x dimensions) weight matrix.
+    The primary dimension of each question gets weight 1.0 and each secondary
+    dimension gets its configured weight.
+    """
+    dim_index = {dim: i for i, dim in enumerate(dimensions)}
+    weights = np.zeros((len(questions), len(dimensions)))
+    for qi, q_data in enumerate(questions):
+        weights[qi, dim_index[q_data["primary_dimension"]]] += 1.0
+        for sec_dim, weight in q_data["secondary_weights"].items():
+            weights[qi, dim_index[sec_dim]] += weight
+    return weights
+
+
+def compile_question_weights(weights):
+    """
+    Returns, for every question, the indices of the dimensions it touches and their
+    weights as a pair of arrays, so one answer can be applied in O(weights) time.
+    """
+    rows = []
+    for row in weights:
+        dims = np.flatnonzero(row)
+        rows.append((dims, row[dims]))
+    return rows
+
+
+def build_connections(questions):
+    """
+    Sums the secondary weights linking each pair of dimensions across the bank.
+    Keys are alphabetically sorted (dim1, dim2) tuples.
+    """
+    connections = {}
+    for q_data in questions:
+        primary_dim = q_data["primary_dimension"]
+        for secondary_dim, weight in q_data["secondary_weights"].items():
+            if primary_dim != secondary_dim:
+                key = tuple(sorted((primary_dim, secondary_dim)))
+                connections.setdefault(key, 0)
+                connections[key] += weight
+    return connections
+
+
+def bank_fingerprint(questions):
+    """Returns a stable hash of a question bank, or of any JSON content, used to key caches derived from it."""
+    payload = json.dumps(questions, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _read_only(array):
+    array.flags.writeable = False
+    return array
+
+
+@dataclass(frozen=True, eq=False)
+class QuizModel:
+    """
+    A question bank compiled for scoring. Built once per bank by compile_model and
+    shared by every session: the arrays are read-only and the dicts must not be
+    modified either.
+    """
+
+    title: str
+    questions: tuple
+    dimensions: tuple
+    dimension_index: dict
+    learning_paths_and_careers: dict
+    # (questions x dimensions) weights, and the max score per dimension when every
+    # question is answered
+    weights: np.ndarray
+    max_score_vector: np.ndarray
+    # Per question: (dimension indices, weights) of its non-zero weights
+    question_weights: tuple
+    connections: dict
+    # Hash of the questions alone, keying what depends only on scoring: norms,
+    # peers, stored sessions and layouts
+    fingerprint: str
+    # Career catalogue searchable by whole-profile similarity
+    careers: CareerIndex
+    # Hash of everything compiled in, careers and learning paths included
+    content_fingerprint: str
+
+    def score(self, responses):
+        """Scores a response vector (Q,) or batch (N x Q); see score_responses."""
+        return score_responses(responses, self.weights)
+
+
+def compile_model(questions, learning_paths_and_careers=None, title="", careers=None):
+    """
+    Compiles a validated list of question dicts into an immutable QuizModel.
+    `careers` is an optional catalogue of {"name", "weights"} careers; without it
+    the careers listed per dimension in `learning_paths_and_careers` are indexed.
+    """
+    questions = tuple(dict(q_data, secondary_weights=dict(q_data["secondary_weights"])) for q_data in questions)
+    dimensions = tuple(collect_dimensions(questions))
+    weights = _read_only(compile_weight_matrix(questions, dimensions))
+    learning_paths_and_careers = dict(learning_paths_and_careers or {})
+    if careers is None:
+        career_index = CareerIndex.from_learning_paths(learning_paths_and_careers, dimensions)
+    else:
+        career_index = CareerIndex.from_catalogue(careers, dimensions)
+    question_weights = tuple(
+        (_read_only(dims), _read_only(row_weights))
+        for dims, row_weights in compile_question_weights(weights)
+    )
+    return QuizModel(
+        title=title,
+        questions=questions,
+        dimensions=dimensions,
+        dimension_index={dim: i for i, dim in enumerate(dimensions)},
+        learning_paths_and_careers=learning_paths_and_careers,
+        weights=weights,
+        max_score_vector=_read_only(weights.sum(axis=0) * MAX_ANSWER),
+        question_weights=question_weights,
+        connections=build_connections(questions),
+        fingerprint=bank_fingerprint(list(questions)),
+        careers=career_index,
+        content_fingerprint=bank_fingerprint({
+            "title": title,
+            "questions": list(questions),
+            "learning_paths_and_careers": learning_paths_and_careers,
+            "careers": careers,
+        }),
+    )
+
+
+def normalize_scores(raw_scores, max_scores):
+    """Scales raw scores to 0-5 against their maximum; NaN where the maximum is zero."""
+    return np.divide(
+        raw_scores * MAX_ANSWER, max_scores,
+        out=np.full_like(raw_scores, np.nan, dtype=np.float64), where=max_scores > 0
+    )
+
+
+def score_responses(responses, weights):
+    """
+    Scores one response vector (Q,) or a batch of response vectors (N x Q) against
+    a (Q x D) weight matrix. Responses are integer answers 1-5, with 0 meaning
+    unanswered; unanswered questions count towards neither the raw score nor the
+    maximum score. Returns (raw_scores, max_scores, normalized_scores) over the
+    dimensions, where normalized scores are on a 0-5 scale and NaN for dimensions
+    with no answers.
+    """
+    responses = np.asarray(responses, dtype=np.float64)
+    answered = (responses > 0).astype(np.float64)
+    raw_scores = responses @ weights
+    max_scores = (answered @ weights) * MAX_ANSWER
+    return raw_scores, max_scores, normalize_scores(raw_scores, max_scores)
+
+
+def top_dimensions(normalized, k=3):
+    """
+    Returns the indices into the dimensions of the k highest normalized scores, best
+    first, for a score vector (D,) or a batch of score vectors (N x D). Ties keep
+    dimension order and unscored (NaN) dimensions always rank last.
+    """
+    ranked = np.where(np.isnan(normalized), -np.inf, normalized)
+    return np.argsort(-ranked, axis=-1, kind="stable")[..., :k]
+
+
+class ScoreAccumulator:
+    """
+    Running raw and maximum scores over a model's dimensions for one quiz session.
+    Each answer change is applied as a delta touching only that question's
+    weights, so the scores are always current without rescoring the bank.
+    """
+
+    __slots__ = ("model", "raw_scores", "max_scores")
+
+    def __init__(self, model):
+        self.model = model
+        self.raw_scores = np.zeros(len(model.dimensions))
+        self.max_scores = np.zeros(len(model.dimensions))
+
+    @classmethod
+    def from_answers(cls, model, answers):
+        """Builds an accumulator from a full answer vector in question-bank order."""
+        accumulator = cls(model)
+        accumulator.raw_scores, accumulator.max_scores, _ = model.score(answers)
+        return accumulator
+
+    def update(self, question_index, old_answer, new_answer):
+        """Replaces the answer to one question (0 = unanswered) in the running totals."""
+        old_answer, new_answer = int(old_answer), int(new_answer)
+        if old_answer == new_answer:
+            return
+        dims, weights = self.model.question_weights[question_index]
+        self.raw_scores[dims] += (new_answer - old_answer) * weights
+        answered_change = (new_answer > 0) - (old_answer > 0)
+        if answered_change:
+            self.max_scores[dims] += answered_change * MAX_ANSWER * weights
+
+    def normalized(self):
+        """Returns the current normalized 0-5 scores, NaN for unanswered dimensions."""
+        return normalize_scores(self.raw_scores, self.max_scores)
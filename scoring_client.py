@@ -0,0 +1,157 @@
+# scoring_client.py
+
+"""
+Client for the scoring service (scoring_service.py), with pooled keep-alive
+connections so repeated calls skip the TCP handshake. Responses are checked
+against the documented shapes, so whatever answers at the configured URL, any
+failure surfaces as ScoringServiceError.
+"""
+
+import http.client
+import json
+import queue
+import threading
+from urllib.parse import urlsplit
+
+import numpy as np
+
+
+class ScoringServiceError(RuntimeError):
+    """Raised when the scoring service cannot be reached, rejects a request or answers unexpectedly."""
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_score_list(scores, dimensions):
+    return (
+        isinstance(scores, list) and len(scores) == len(dimensions)
+        and all(score is None or _is_number(score) for score in scores)
+    )
+
+
+def _expect(valid, path):
+    if not valid:
+        raise ScoringServiceError(f"Scoring service returned an unexpected {path} response")
+
+
+class ScoringClient:
+    """
+    A thread-safe client for one scoring service. Up to `pool_size` idle HTTP/1.1
+    connections are kept open and reused; a connection that the server has closed
+    in the meantime is replaced and the request retried once.
+    """
+
+    def __init__(self, base_url, timeout=5.0, pool_size=8):
+        url = urlsplit(base_url)
+        if url.scheme not in ("http", "https") or not url.hostname:
+            raise ValueError(f"Invalid scoring service URL {base_url!r}")
+        self._connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        self.host = url.hostname
+        self.port = url.port
+        self.base_path = url.path.rstrip("/")
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+
+    def _connection(self):
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            with self._lock:
+                self.connections_opened += 1
+            return self._connection_class(self.host, self.port, timeout=self.timeout), False
+
+    def _release(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def request(self, method, path, payload=None):
+        """Sends one request and returns the decoded JSON response."""
+        body = None if payload is None else json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        for attempt in range(2):
+            conn, reused = self._connection()
+            try:
+                conn.request(method, self.base_path + path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError) as exc:
+                conn.close()
+                # A pooled connection may have been closed by the server while idle
+                if reused and attempt == 0:
+                    continue
+                raise ScoringServiceError(f"Scoring service connection failed: {exc}") from exc
+            except (OSError, http.client.HTTPException) as exc:
+                conn.close()
+                raise ScoringServiceError(f"Scoring service request failed: {exc}") from exc
+
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+            try:
+                result = json.loads(data)
+            except ValueError as exc:
+                raise ScoringServiceError(f"Scoring service returned invalid JSON ({response.status})") from exc
+            if response.status != 200:
+                error = result.get("error") if isinstance(result, dict) else result
+                raise ScoringServiceError(f"Scoring service error {response.status}: {error}")
+            _expect(isinstance(result, dict), path)
+            return result
+
+    def close(self):
+        """Closes every idle connection."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    # --- API ---
+
+    def score(self, answers, bank=None):
+        """Scores one answer vector; returns the service's /score response."""
+        result = self.request("POST", "/score", {"bank": bank, "answers": np.asarray(answers).tolist()})
+        dimensions = result.get("dimensions")
+        _expect(
+            isinstance(result.get("fingerprint"), str) and isinstance(dimensions, list)
+            and _is_score_list(result.get("scores"), dimensions),
+            "/score",
+        )
+        return result
+
+    def score_batch(self, answers, bank=None):
+        """Scores an (N x Q) batch of answer vectors; returns the /score_batch response."""
+        result = self.request("POST", "/score_batch", {"bank": bank, "answers": np.asarray(answers).tolist()})
+        dimensions = result.get("dimensions")
+        scores = result.get("scores")
+        _expect(
+            isinstance(result.get("fingerprint"), str) and isinstance(dimensions, list) and isinstance(scores, list)
+            and len(scores) == len(answers) and all(_is_score_list(row, dimensions) for row in scores),
+            "/score_batch",
+        )
+        return result
+
+    def recommend(self, normalized, k=5, bank=None):
+        """Recommends careers for a normalized score vector; returns the service's /recommend response."""
+        scores = [None if np.isnan(score) else float(score) for score in normalized]
+        result = self.request("POST", "/recommend", {"bank": bank, "scores": scores, "k": k})
+        careers = result.get("careers")
+        _expect(
+            isinstance(result.get("fingerprint"), str) and isinstance(result.get("content_fingerprint"), str)
+            and isinstance(careers, list)
+            and all(
+                isinstance(career, dict) and isinstance(career.get("name"), str) and _is_number(career.get("similarity"))
+                for career in careers
+            ),
+            "/recommend",
+        )
+        return result
+
+    def health(self):
+        return self.request("GET", "/health")
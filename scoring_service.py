@@ -0,0 +1,262 @@
+# scoring_service.py
+
+"""
+Stateless HTTP/JSON scoring and recommendation service, decoupled from the UI.
+
+Usage:
+    python scoring_service.py [--host HOST] [--port PORT] [--workers N]
+
+Every request carries everything needed to answer it, so any worker process can
+serve any request and the service scales by adding workers or nodes. Requests
+are served with HTTP/1.1 keep-alive by a pre-forked pool of worker processes
+sharing one listening socket, each with its own threads. Banks are compiled and
+hot-reloaded through the same QuizModel cache as the app (quiz_bank.load_model).
+
+Endpoints (POST bodies and responses are JSON; "bank" is an optional quiz name
+from banks/, the default bank otherwise; NaN scores are returned as null):
+
+    POST /score        {"bank", "answers": [Q answers 0-5]}
+                       -> {"fingerprint", "dimensions", "scores": [D], "top": [3 dimensions]}
+    POST /score_batch  {"bank", "answers": [[Q answers], ...]}
+                       -> {"fingerprint", "dimensions", "scores": [[D], ...], "top": [[3], ...]}
+    POST /recommend    {"bank", "k": 5, and "scores": [D] or "answers": [Q]}
+                       -> {"fingerprint", "content_fingerprint", "careers": [{"name", "similarity"}, ...]}
+    GET  /health       -> {"status": "ok"}
+"""
+
+import argparse
+import json
+import logging
+import os
+import signal
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from quiz_bank import DEFAULT_BANK_PATH, BankError, bank_path, load_model
+from recommend import DEFAULT_TOP_K
+from scoring import MAX_ANSWER, top_dimensions
+
+DEFAULT_PORT = 8502
+DEFAULT_BANK_FILE = os.environ.get("JAGGED_QUIZ_BANK", DEFAULT_BANK_PATH)
+TOP_K = 3
+# Largest request body accepted, to bound memory per request
+MAX_BODY_BYTES = 64 * 1024 * 1024
+MAX_RECOMMENDATIONS = 100
+
+logger = logging.getLogger(__name__)
+
+
+class RequestError(ValueError):
+    """Raised for a malformed request; reported to the client as 400 Bad Request."""
+
+
+def resolve_model(body):
+    """Returns the compiled model for the request's "bank" (a quiz name), or the default bank."""
+    name = body.get("bank")
+    if name is not None and not isinstance(name, str):
+        raise RequestError("'bank' must be a quiz name or null")
+    try:
+        return load_model(bank_path(name) if name else DEFAULT_BANK_FILE)
+    except BankError as exc:
+        raise RequestError(str(exc)) from exc
+
+
+def parse_answers(model, answers, batch):
+    """Validates a (Q,) answer list, or an (N x Q) batch, as an int8 array."""
+    try:
+        array = np.asarray(answers, dtype=np.float64)
+    except (TypeError, ValueError) as exc:
+        raise RequestError("'answers' must contain only numbers") from exc
+    expected_ndim = 2 if batch else 1
+    if array.ndim != expected_ndim or array.shape[-1] != len(model.questions):
+        shape = "a list of answer lists" if batch else "a list"
+        raise RequestError(f"'answers' must be {shape} of {len(model.questions)} answers")
+    if ((array < 0) | (array > MAX_ANSWER) | (array != np.round(array))).any():
+        raise RequestError(f"answers must be whole numbers 0-{MAX_ANSWER} (0 = unanswered)")
+    return array.astype(np.int8)
+
+
+def _scores_json(normalized):
+    """Converts normalized scores to nested lists with None for NaN."""
+    return np.where(np.isnan(normalized), None, np.round(normalized, 6).astype(object)).tolist()
+
+
+def score(body):
+    model = resolve_model(body)
+    answers = parse_answers(model, body.get("answers"), batch=False)
+    _, _, normalized = model.score(answers)
+    top = top_dimensions(normalized, k=TOP_K)
+    return {
+        "fingerprint": model.fingerprint,
+        "dimensions": list(model.dimensions),
+        "scores": _scores_json(normalized),
+        "top": [model.dimensions[i] for i in top if not np.isnan(normalized[i])],
+    }
+
+
+def score_batch(body):
+    model = resolve_model(body)
+    answers = parse_answers(model, body.get("answers"), batch=True)
+    _, _, normalized = model.score(answers)
+    top = top_dimensions(normalized, k=TOP_K)
+    return {
+        "fingerprint": model.fingerprint,
+        "dimensions": list(model.dimensions),
+        "scores": _scores_json(normalized),
+        "top": [
+            [model.dimensions[i] for i in row if not np.isnan(scores[i])]
+            for row, scores in zip(top, normalized)
+        ],
+    }
+
+
+def recommend(body):
+    model = resolve_model(body)
+    k = body.get("k", DEFAULT_TOP_K)
+    if not isinstance(k, int) or isinstance(k, bool) or not 0 < k <= MAX_RECOMMENDATIONS:
+        raise RequestError(f"'k' must be a whole number 1-{MAX_RECOMMENDATIONS}")
+    if "scores" in body:
+        try:
+            normalized = np.array([np.nan if s is None else s for s in body["scores"]], dtype=np.float64)
+        except (TypeError, ValueError) as exc:
+            raise RequestError("'scores' must be a list of numbers or nulls") from exc
+        if normalized.shape != (len(model.dimensions),):
+            raise RequestError(f"'scores' must list {len(model.dimensions)} scores in dimension order")
+    else:
+        _, _, normalized = model.score(parse_answers(model, body.get("answers"), batch=False))
+    return {
+        "fingerprint": model.fingerprint,
+        "content_fingerprint": model.content_fingerprint,
+        "careers": [
+            {"name": name, "similarity": round(similarity, 6)}
+            for name, similarity in model.careers.top_careers(normalized, k=k)
+        ],
+    }
+
+
+ROUTES = {"/score": score, "/score_batch": score_batch, "/recommend": recommend}
+
+
+class ScoringRequestHandler(BaseHTTPRequestHandler):
+    """Serves the JSON endpoints over HTTP/1.1 with keep-alive."""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "JaggedQuizScoring/1.0"
+    # Headers and body are separate writes; without TCP_NODELAY every keep-alive
+    # response would wait on the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": f"Unknown endpoint {self.path}"})
+
+    def do_POST(self):
+        handler = ROUTES.get(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self._send_json(413, {"error": "Request body too large"})
+            return
+        body = self.rfile.read(length)
+        if handler is None:
+            self._send_json(404, {"error": f"Unknown endpoint {self.path}"})
+            return
+        try:
+            request = json.loads(body or b"{}")
+            if not isinstance(request, dict):
+                raise RequestError("The request body must be a JSON object")
+            self._send_json(200, handler(request))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            self._send_json(400, {"error": "The request body must be JSON"})
+        except RequestError as exc:
+            self._send_json(400, {"error": str(exc)})
+        except Exception:
+            logger.exception("Failed to handle %s", self.path)
+            self._send_json(500, {"error": "Internal error"})
+
+    def log_message(self, format, *args):
+        # Access logs on every request would dominate the cost of a score
+        pass
+
+
+class ScoringServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def serve(host="127.0.0.1", port=DEFAULT_PORT, workers=1):
+    """
+    Serves the API on host:port. With several workers, the listening socket is
+    bound once and shared by `workers` forked processes, which the kernel balances
+    connections across; the parent only supervises them.
+    """
+    server = ScoringServer((host, port), ScoringRequestHandler)
+    # Compile the default bank before forking, so workers start with it loaded
+    load_model(DEFAULT_BANK_FILE)
+    if workers <= 1 or not hasattr(os, "fork"):
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+        return
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        for pid in children:
+            while True:
+                try:
+                    os.waitpid(pid, 0)
+                    break
+                except InterruptedError:
+                    continue
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve quiz scoring and recommendations over HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on (default: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT}).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count).")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    logger.info("Serving on http://%s:%d with %d worker(s)", args.host, args.port, args.workers)
+    serve(args.host, args.port, args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
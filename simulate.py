@@ -0,0 +1,186 @@
+# simulate.py
+
+"""
+Monte Carlo simulation of synthetic respondents, to calibrate the scoring.
+
+Usage:
+    python -m jagged_quiz simulate [--respondents N] [--distribution uniform|biased|correlated] ...
+
+Respondents are generated in vectorized batches as (N x Q) int8 answer matrices
+under one of the answer distributions below, scored through the bank's real
+QuizModel and summarized per dimension: mean, standard deviation, quantiles
+(from a ScoreNorms sketch) and how often the dimension lands in the top three
+shown on the results page. Under answers that do not favour any dimension every
+dimension should reach the top three equally often, at 3/D; dimensions that
+are far off reveal biases in the normalization, e.g. heavily cross-weighted
+dimensions whose scores average over more questions and so spread less.
+
+Distributions:
+    uniform     every answer independently uniform on 1-5
+    biased      every answer independently from --probabilities over 1-5
+    correlated  each respondent has a latent trait per dimension (normal, with
+                correlation --rho between dimensions); an answer is the question's
+                weight-averaged trait plus noise, rounded and clipped to 1-5
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from norms import ScoreNorms
+from quiz_bank import DEFAULT_BANK_PATH, load_model
+from scoring import MAX_ANSWER, top_dimensions
+
+TOP_K = 3
+DEFAULT_BATCH_SIZE = 100_000
+DEFAULT_PROBABILITIES = (0.05, 0.10, 0.20, 0.30, 0.35)
+
+
+def uniform_answers(rng, n, model):
+    """Answers drawn uniformly from 1-5."""
+    return rng.integers(1, MAX_ANSWER + 1, size=(n, len(model.questions)), dtype=np.int8)
+
+
+def biased_answers(rng, n, model, probabilities=DEFAULT_PROBABILITIES):
+    """Answers drawn independently with the given probabilities for 1-5."""
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    if probabilities.shape != (MAX_ANSWER,) or (probabilities < 0).any():
+        raise ValueError(f"probabilities must be {MAX_ANSWER} non-negative numbers")
+    thresholds = np.cumsum(probabilities / probabilities.sum())
+    draws = rng.random((n, len(model.questions)), dtype=np.float32)
+    # Bucket each uniform draw by the cumulative probabilities: 0 -> answer 1, ...
+    return (np.searchsorted(thresholds[:-1], draws, side="right") + 1).astype(np.int8)
+
+
+def correlated_answers(rng, n, model, rho=0.3, trait_sd=1.0, noise_sd=0.8):
+    """
+    Answers driven by a latent trait per dimension: traits are standard normal with
+    correlation `rho` between any two dimensions, scaled by `trait_sd`; each answer
+    is 3 + the question's weight-averaged trait + N(0, noise_sd), rounded to 1-5.
+    """
+    dims = len(model.dimensions)
+    shared = rng.standard_normal((n, 1))
+    own = rng.standard_normal((n, dims))
+    traits = (np.sqrt(rho) * shared + np.sqrt(1 - rho) * own) * trait_sd
+    question_mix = model.weights / model.weights.sum(axis=1, keepdims=True)
+    latent = traits @ question_mix.T + rng.normal(0, noise_sd, (n, len(model.questions)))
+    return np.clip(np.rint(latent + (1 + MAX_ANSWER) / 2), 1, MAX_ANSWER).astype(np.int8)
+
+
+DISTRIBUTIONS = {
+    "uniform": uniform_answers,
+    "biased": biased_answers,
+    "correlated": correlated_answers,
+}
+
+
+class SimulationStats:
+    """Mergeable per-dimension summary of simulated normalized scores."""
+
+    def __init__(self, dimensions):
+        self.dimensions = tuple(dimensions)
+        self.respondents = 0
+        self.sums = np.zeros(len(self.dimensions))
+        self.sums_of_squares = np.zeros(len(self.dimensions))
+        self.top_counts = np.zeros(len(self.dimensions), dtype=np.int64)
+        self.norms = ScoreNorms(self.dimensions)
+
+    def add(self, normalized):
+        """Adds a batch (N x D) of normalized scores; every respondent answers every question."""
+        self.respondents += len(normalized)
+        self.sums += normalized.sum(axis=0)
+        self.sums_of_squares += (normalized ** 2).sum(axis=0)
+        top = top_dimensions(normalized, k=min(TOP_K, len(self.dimensions)))
+        self.top_counts += np.bincount(top.ravel(), minlength=len(self.dimensions))
+        self.norms.add(normalized)
+
+    def merge(self, other):
+        """Adds another summary over the same dimensions into this one."""
+        self.respondents += other.respondents
+        self.sums += other.sums
+        self.sums_of_squares += other.sums_of_squares
+        self.top_counts += other.top_counts
+        self.norms.merge(other.norms)
+        return self
+
+    def report(self):
+        """Returns {"respondents", "top_k_expected_rate", "dimensions": {dim: stats}}."""
+        n = max(self.respondents, 1)
+        means = self.sums / n
+        stds = np.sqrt(np.maximum(self.sums_of_squares / n - means ** 2, 0))
+        quantiles = {f"p{int(q * 100):02d}": self.norms.quantiles(q) for q in (0.05, 0.5, 0.95)}
+        return {
+            "respondents": self.respondents,
+            "top_k_expected_rate": min(TOP_K, len(self.dimensions)) / len(self.dimensions),
+            "dimensions": {
+                dim: {
+                    "mean": float(means[i]),
+                    "std": float(stds[i]),
+                    **{name: float(values[i]) for name, values in quantiles.items()},
+                    "top_k_rate": float(self.top_counts[i] / n),
+                }
+                for i, dim in enumerate(self.dimensions)
+            },
+        }
+
+
+def simulate_model(model, respondents, distribution="uniform", seed=None, batch_size=DEFAULT_BATCH_SIZE, **params):
+    """Simulates `respondents` answer sets against a model in batches; returns SimulationStats."""
+    generate = DISTRIBUTIONS[distribution]
+    rng = np.random.default_rng(seed)
+    stats = SimulationStats(model.dimensions)
+    for start in range(0, respondents, batch_size):
+        answers = generate(rng, min(batch_size, respondents - start), model, **params)
+        _, _, normalized = model.score(answers)
+        stats.add(normalized)
+    return stats
+
+
+def _simulate_share(bank_path, respondents, distribution, seed, batch_size, params):
+    return simulate_model(load_model(bank_path), respondents, distribution, seed, batch_size, **params)
+
+
+def simulate(respondents, distribution="uniform", bank_path=DEFAULT_BANK_PATH, seed=None,
+             batch_size=DEFAULT_BATCH_SIZE, workers=1, **params):
+    """
+    Simulates `respondents` synthetic respondents against a bank file, split over
+    `workers` processes with independent random streams, and returns the merged
+    SimulationStats.
+    """
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution {distribution!r}, expected one of {', '.join(DISTRIBUTIONS)}")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        return _simulate_share(bank_path, respondents, distribution, seed, batch_size, params)
+
+    shares = [respondents // workers + (i < respondents % workers) for i in range(workers)]
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_simulate_share, bank_path, share, distribution, worker_seed, batch_size, params)
+            for share, worker_seed in zip(shares, seeds) if share
+        ]
+        stats = SimulationStats(load_model(bank_path).dimensions)
+        for future in futures:
+            stats.merge(future.result())
+    return stats
+
+
+def format_report(report):
+    """Renders a SimulationStats report as a table, most over-represented dimensions first."""
+    expected = report["top_k_expected_rate"]
+    lines = [
+        f"{report['respondents']} respondents; each dimension would reach the top {TOP_K} "
+        f"{expected:.1%} of the time if unbiased",
+        "",
+        f"{'dimension':<36} {'mean':>6} {'std':>6} {'p05':>6} {'p50':>6} {'p95':>6} {'top-3':>7} {'vs fair':>8}",
+    ]
+    rows = sorted(report["dimensions"].items(), key=lambda item: -item[1]["top_k_rate"])
+    for dim, stats in rows:
+        lines.append(
+            f"{dim[:36]:<36} {stats['mean']:>6.2f} {stats['std']:>6.3f} {stats['p05']:>6.2f} {stats['p50']:>6.2f} "
+            f"{stats['p95']:>6.2f} {stats['top_k_rate']:>7.1%} {stats['top_k_rate'] / expected:>7.2f}x"
+        )
+    return "\n".join(lines)